@@ -4,11 +4,16 @@
 # Role: GitHub MCP adapter server
 # Owner: core
 # Secrets: none
-# Notes: Used by pre-commit (validate-amara-script-headers)
+# Notes: Used by pre-commit (validate-amara-script-headers); one pooled keep-alive (HTTP/2 if h2 is installed) client per process;
+#        GETs go through an LRU+TTL cache revalidated with ETag / Last-Modified (304s don't count against the rate limit)
 # --------------------------------
 
 import os
+import time
+import importlib.util
 import typing as t
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Query
 from pydantic import BaseModel
 import httpx
@@ -31,24 +36,134 @@ HEADERS = {
     "User-Agent": UA,
 }
 
+# Connection pool / timeouts for api.github.com (one client for the life of the process)
+# GITHUB_HTTP2: auto (use HTTP/2 when the h2 package is installed) | 1 | 0
+GITHUB_HTTP2 = os.getenv("GITHUB_HTTP2", "auto")
+HTTP2 = importlib.util.find_spec("h2") is not None if GITHUB_HTTP2 == "auto" else GITHUB_HTTP2 == "1"
+LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("GITHUB_MAX_CONNECTIONS", "20")),
+    max_keepalive_connections=int(os.getenv("GITHUB_MAX_KEEPALIVE", "10")),
+    keepalive_expiry=float(os.getenv("GITHUB_KEEPALIVE_EXPIRY", "60")),
+)
+TIMEOUT = httpx.Timeout(
+    float(os.getenv("GITHUB_TIMEOUT", "30")),
+    connect=float(os.getenv("GITHUB_CONNECT_TIMEOUT", "5")),
+    pool=float(os.getenv("GITHUB_POOL_TIMEOUT", "10")),
+)
+
+# GET response cache: fresh for GITHUB_CACHE_TTL seconds, then revalidated (GITHUB_CACHE_SIZE=0 disables)
+CACHE_SIZE = int(os.getenv("GITHUB_CACHE_SIZE", "512"))
+CACHE_TTL = float(os.getenv("GITHUB_CACHE_TTL", "15"))
+
 def gh_url(path: str) -> str:
     return f"https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}{path}"
 
-async def _gh_get(url: str, *, params: dict | None = None):
-    async with httpx.AsyncClient(timeout=30) as client:
-        r = await client.get(url, headers=HEADERS, params=params)
-    if r.status_code >= 400:
-        raise HTTPException(status_code=r.status_code, detail=r.text)
-    return r.json()
 
-async def _gh_post(url: str, *, json: dict):
-    async with httpx.AsyncClient(timeout=30) as client:
-        r = await client.post(url, headers=HEADERS, json=json)
+class ConditionalCache:
+    """
+    In-process LRU of GET url+params -> (validators, body). Entries younger than `ttl`
+    are served without an upstream call; older ones are revalidated with
+    If-None-Match / If-Modified-Since, and a 304 refreshes them.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._data: "OrderedDict[tuple, dict]" = OrderedDict()
+
+    @staticmethod
+    def key(url: str, params: dict | None) -> tuple:
+        return (url, tuple(sorted((params or {}).items())))
+
+    def get(self, key: tuple) -> dict | None:
+        entry = self._data.get(key)
+        if entry is not None:
+            self._data.move_to_end(key)
+        return entry
+
+    def fresh(self, entry: dict) -> bool:
+        return time.monotonic() - entry["stored"] <= self.ttl
+
+    def put(self, key: tuple, response: httpx.Response, body: t.Any) -> None:
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if self.maxsize <= 0 or not (etag or last_modified):
+            return
+        self._data[key] = {"stored": time.monotonic(), "etag": etag, "last_modified": last_modified, "body": body}
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, url_prefix: str) -> None:
+        for key in [k for k in self._data if k[0].startswith(url_prefix)]:
+            del self._data[key]
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+        }
+
+
+response_cache = ConditionalCache(CACHE_SIZE, CACHE_TTL)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Reused across tool calls: after the first request, calls skip the TCP+TLS handshake
+    # (and with HTTP/2, concurrent calls share one multiplexed connection)
+    app.state.gh = httpx.AsyncClient(headers=HEADERS, http2=HTTP2, limits=LIMITS, timeout=TIMEOUT)
+    try:
+        yield
+    finally:
+        await app.state.gh.aclose()
+
+app = FastAPI(title="Amara GitHub MCP Adapter", version="0.1.2", lifespan=lifespan)
+
+async def _gh_send(method: str, url: str, **kwargs) -> httpx.Response:
+    try:
+        r = await app.state.gh.request(method, url, **kwargs)
+    except httpx.TimeoutException as e:
+        raise HTTPException(status_code=504, detail=f"GitHub API timeout: {e!r}")
+    except httpx.TransportError as e:
+        raise HTTPException(status_code=502, detail=f"GitHub API unreachable: {e!r}")
     if r.status_code >= 400:
         raise HTTPException(status_code=r.status_code, detail=r.text)
-    return r.json()
+    return r
 
-app = FastAPI(title="Amara GitHub MCP Adapter", version="0.1.1")
+async def _gh_get(url: str, *, params: dict | None = None):
+    key = response_cache.key(url, params)
+    entry = response_cache.get(key)
+    if entry is not None and response_cache.fresh(entry):
+        response_cache.hits += 1
+        return entry["body"]
+    headers = {}
+    if entry is not None:
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+    r = await _gh_send("GET", url, params=params, headers=headers)
+    if r.status_code == 304 and entry is not None:
+        response_cache.revalidated += 1
+        entry["stored"] = time.monotonic()
+        return entry["body"]
+    response_cache.misses += 1
+    body = r.json()
+    response_cache.put(key, r, body)
+    return body
+
+async def _gh_post(url: str, *, json: dict):
+    body = (await _gh_send("POST", url, json=json)).json()
+    # A new issue/comment changes the lists agents poll; don't serve them stale for the TTL
+    response_cache.invalidate(gh_url("/issues"))
+    return body
 
 # ---------- Schemas ----------
 class ListIssuesParams(BaseModel):
@@ -74,7 +189,7 @@ class ListPRsParams(BaseModel):
 # ---------- Endpoints ----------
 @app.get("/health")
 async def health():
-    return {"ok": True, "repo": f"{GITHUB_OWNER}/{GITHUB_REPO}"}
+    return {"ok": True, "repo": f"{GITHUB_OWNER}/{GITHUB_REPO}", "http2": HTTP2, "cache": response_cache.stats()}
 
 @app.get("/contents")
 async def list_contents(
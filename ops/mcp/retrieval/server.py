@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# --- Amara Script Metadata ---
+# Repo: amara-core
+# Role: Retrieval MCP adapter (query embedding + Qdrant search)
+# Owner: core
+# Secrets: reads $OPENAI_API_KEY if EMBED_MODE=openai
+# Notes: Embeds queries via scripts/embed.py (copied into the image); LRU+TTL query cache; one pooled Qdrant client
+# --------------------------------
+
+import os
+import sys
+import time
+import asyncio
+import typing as t
+from pathlib import Path
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+import grpc
+import httpx
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel, Field
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http import models as qm
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+
+try:
+    import embed  # copied next to server.py in the image
+except ImportError:
+    # Running from a checkout: use the repo's scripts/ directly
+    sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "scripts"))
+    import embed
+import qdrant_init
+
+# --- Env & constants ---
+QDRANT_URL = os.getenv("QDRANT_URL", "http://qdrant:6333")
+QDRANT_COLLECTION = os.getenv("QDRANT_COLLECTION", "amara_docs")
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "0") == "1"
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "2048"))
+CACHE_TTL = float(os.getenv("RETRIEVAL_CACHE_TTL", "3600"))
+MAX_QUERIES = int(os.getenv("RETRIEVAL_MAX_QUERIES", "64"))
+
+EMBED_MODE = embed.resolve_mode()
+if EMBED_MODE not in embed.EMBEDDERS:
+    raise SystemExit(f"EMBED_MODE={EMBED_MODE} cannot embed queries; use: {' | '.join(embed.EMBEDDERS)}")
+
+
+class TTLCache:
+    """In-process LRU of query -> embedding; entries expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[str, tuple[float, list[float]]]" = OrderedDict()
+
+    def get(self, key: str) -> t.Optional[t.List[float]]:
+        item = self._data.get(key)
+        if item is None or time.monotonic() - item[0] > self.ttl:
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def put(self, key: str, vec: t.List[float]) -> None:
+        self._data[key] = (time.monotonic(), vec)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "maxsize": self.maxsize, "ttl": self.ttl, "hits": self.hits, "misses": self.misses}
+
+
+query_cache = TTLCache(CACHE_SIZE, CACHE_TTL)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One client (and connection pool) for the life of the process
+    app.state.qdrant = AsyncQdrantClient(url=QDRANT_URL, prefer_grpc=QDRANT_PREFER_GRPC, grpc_port=QDRANT_GRPC_PORT)
+    try:
+        yield
+    finally:
+        await app.state.qdrant.close()
+
+
+app = FastAPI(title="Amara Retrieval MCP Adapter", version="0.1.0", lifespan=lifespan)
+
+
+# ---------- Schemas ----------
+class SearchParams(BaseModel):
+    queries: t.List[str] = Field(..., min_length=1, description="One or more queries, searched in one batch")
+    top_k: int = Field(5, ge=1, le=100)
+    file_contains: t.Optional[str] = Field(None, description="Only return chunks whose file path contains this substring")
+
+
+# ---------- Helpers ----------
+async def _embed_queries(queries: t.List[str]) -> t.List[t.List[float]]:
+    """Serve cached embeddings; embed all misses in a single backend call."""
+    vecs: t.Dict[str, t.List[float]] = {}
+    missing: t.List[str] = []
+    for q in queries:
+        if q in vecs or q in missing:
+            continue
+        hit = query_cache.get(q)
+        if hit is None:
+            missing.append(q)
+        else:
+            vecs[q] = hit
+    if missing:
+        # embed.py backends are synchronous (and batch/retry internally); keep the loop free
+        fresh = await asyncio.to_thread(embed.embed_texts, missing, EMBED_MODE)
+        for q, v in zip(missing, fresh):
+            query_cache.put(q, v)
+            vecs[q] = v
+    return [vecs[q] for q in queries]
+
+
+def _query_filter(p: SearchParams) -> t.Optional[qm.Filter]:
+    if not p.file_contains:
+        return None
+    return qm.Filter(must=[qm.FieldCondition(key="file", match=qm.MatchText(text=p.file_contains))])
+
+
+# ---------- Endpoints ----------
+@app.get("/health")
+async def health():
+    return {
+        "ok": True,
+        "collection": QDRANT_COLLECTION,
+        "embed_mode": EMBED_MODE,
+        "query_cache": query_cache.stats(),
+    }
+
+
+@app.post("/tools/search")
+async def search(p: SearchParams):
+    if len(p.queries) > MAX_QUERIES:
+        raise HTTPException(status_code=422, detail=f"at most {MAX_QUERIES} queries per request")
+    try:
+        vecs = await _embed_queries(p.queries)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"query embedding failed: {e}")
+
+    qfilter = _query_filter(p)
+    params = qdrant_init.search_params()
+    requests = [
+        qm.QueryRequest(query=v, limit=p.top_k, filter=qfilter, params=params, with_payload=True)
+        for v in vecs
+    ]
+    try:
+        responses = await app.state.qdrant.query_batch_points(collection_name=QDRANT_COLLECTION, requests=requests)
+    except UnexpectedResponse as e:
+        raise HTTPException(status_code=502, detail=f"Qdrant search failed: HTTP {e.status_code} {e.content!r}")
+    except grpc.RpcError as e:
+        raise HTTPException(status_code=502, detail=f"Qdrant search failed: {e!r}")
+    except (httpx.HTTPError, ResponseHandlingException) as e:
+        raise HTTPException(status_code=502, detail=f"Qdrant unreachable: {e!r}")
+
+    results = []
+    for q, resp in zip(p.queries, responses):
+        hits = []
+        for pt in resp.points:
+            payload = pt.payload or {}
+            hits.append(
+                {
+                    "id": payload.get("source_id", str(pt.id)),
+                    "score": pt.score,
+                    "file": payload.get("file"),
+                    "chunk": payload.get("chunk"),
+                }
+            )
+        results.append({"query": q, "hits": hits})
+    return {"results": results}
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# --- Amara Script Metadata ---
+# Repo: amara-core
+# Role: End-to-end ingest benchmark on a synthetic corpus (offline, EMBED_MODE=fake)
+# Owner: core
+# Secrets: none
+# Notes: Times iter_files, chunking, dedup, embedding, manifest/vector writes and upsert (Qdrant local mode); writes JSON
+# --------------------------------
+"""
+bench_ingest.py
+
+Generates a deterministic synthetic corpus, points embed.py at it, and times each
+ingest stage with the fake embedding backend (no network, no model). Upsert runs
+against qdrant-client's in-memory local mode when qdrant-client is installed.
+
+  python scripts/bench_ingest.py --files 2000 --file-kb 8
+  python scripts/bench_ingest.py --files 500 --latency-ms 150 --dup-ratio 0.2 --repeat 3
+
+Results go to artifacts/bench/ingest-<timestamp>-<commit>.json so runs can be
+compared across commits.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+import importlib
+from pathlib import Path
+from typing import Any, Dict, List
+
+import embed
+from lib.metrics import RunMetrics, peak_rss_mb
+
+WORDS = (
+	"qdrant embed vector chunk manifest sync source context agent docs collection upsert "
+	"payload index token batch model cache retrieval gateway nginx compose script repo "
+	"delta runbook session schema yaml python shell config storage artifact search"
+).split()
+EXTS = [".md", ".md", ".md", ".yaml", ".py", ".sh"]
+
+
+def make_corpus(root: Path, files: int, file_kb: int, dup_ratio: float, seed: int) -> int:
+	"""Write `files` pseudo-random text files under root; a dup_ratio share are copies. Returns bytes written."""
+	rng = random.Random(seed)
+	total = 0
+	bodies: List[str] = []
+	for i in range(files):
+		if bodies and rng.random() < dup_ratio:
+			body = rng.choice(bodies)
+		else:
+			n_words = file_kb * 1024 // 7
+			body = " ".join(rng.choice(WORDS) + ("\n" if rng.random() < 0.1 else "") for _ in range(n_words))
+			bodies.append(body)
+		p = root / f"src{i % 7}" / f"doc_{i:05d}{EXTS[i % len(EXTS)]}"
+		p.parent.mkdir(parents=True, exist_ok=True)
+		p.write_text(body, encoding="utf-8")
+		total += len(body)
+	return total
+
+
+def git_commit() -> str:
+	try:
+		return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=embed.ROOT, text=True).strip()
+	except Exception:
+		return "unknown"
+
+
+def bench_once(corpus: Path, out_dir: Path, upsert: bool) -> Dict[str, Any]:
+	embed.CTX = corpus
+	embed.OUT = out_dir
+	embed._QDRANT.clear()
+	# Fresh collector per run; embed.py's own stages (e.g. upsert) report into it too
+	metrics = embed.METRICS = RunMetrics("bench_ingest")
+
+	with metrics.stage("walk") as st:
+		files = list(embed.iter_files())
+		st.add(items=len(files), nbytes=sum(p.stat().st_size for p in files))
+
+	with metrics.stage("chunk") as st:
+		triples = list(embed.iter_chunks(files))
+		st.add(items=len(triples))
+
+	dedup = embed.ChunkDeduper.from_env()
+	with metrics.stage("dedup") as st:
+		unique = [t for t in triples if dedup is None or not dedup.check(t[2], t[1])]
+		st.add(items=len(triples))
+	chunks = [(doc_id, ch) for doc_id, ch, _ in unique]
+	entries = [entry for _, _, entry in unique]
+
+	vecs = embed.attach_meta(embed.metered_embed("fake", chunks), entries)
+
+	manifest = [entry for _, _, entry in triples]
+	with metrics.stage("write_manifest") as st:
+		embed.write_manifest(manifest, "chunks.manifest.json")
+		st.add(items=len(manifest), nbytes=(out_dir / "chunks.manifest.json").stat().st_size)
+	with metrics.stage("write_vectors") as st:
+		embed.write_vectors(vecs)
+		st.add(items=len(vecs), nbytes=(out_dir / embed.VECTORS_NPY).stat().st_size)
+
+	if upsert:
+		embed.maybe_qdrant_upsert(vecs)
+	return metrics.to_dict()
+
+
+def main(argv: List[str]) -> int:
+	parser = argparse.ArgumentParser(description="Offline end-to-end ingest benchmark (synthetic corpus, fake embeddings).")
+	parser.add_argument("--files", type=int, default=500)
+	parser.add_argument("--file-kb", type=int, default=8)
+	parser.add_argument("--dup-ratio", type=float, default=0.0, help="Share of files that copy an earlier file")
+	parser.add_argument("--dim", type=int, default=int(os.getenv("EMBED_FAKE_DIM", "1536")))
+	parser.add_argument("--latency-ms", type=float, default=float(os.getenv("EMBED_FAKE_LATENCY_MS", "0")))
+	parser.add_argument("--repeat", type=int, default=1)
+	parser.add_argument("--seed", type=int, default=42)
+	parser.add_argument("--no-upsert", action="store_true", help="Skip the Qdrant local-mode upsert stage")
+	parser.add_argument("--out", type=Path, help="Result JSON path (default artifacts/bench/ingest-<ts>-<commit>.json)")
+	args = parser.parse_args(argv)
+	if args.repeat < 1:
+		parser.error("--repeat must be at least 1")
+
+	upsert = not args.no_upsert
+	if upsert:
+		try:
+			importlib.import_module("qdrant_client")
+		except Exception:
+			print("[WARN] qdrant-client not installed; skipping upsert stage")
+			upsert = False
+
+	# Benchmark settings must not leak into (or read from) the real cache/collection
+	os.environ.update(
+		EMBED_CACHE="0",
+		EMBED_FAKE_DIM=str(args.dim),
+		EMBED_FAKE_LATENCY_MS=str(args.latency_ms),
+		EMBED_QDRANT_UPSERT="1" if upsert else "0",
+		QDRANT_LOCATION=":memory:",
+		QDRANT_COLLECTION="bench_ingest",
+	)
+
+	commit = git_commit()
+	runs = []
+	with tempfile.TemporaryDirectory(prefix="amara_bench_") as td:
+		corpus = Path(td) / "context"
+		corpus_bytes = make_corpus(corpus, args.files, args.file_kb, args.dup_ratio, args.seed)
+		for i in range(args.repeat):
+			out_dir = Path(td) / f"out{i}"
+			out_dir.mkdir()
+			runs.append(bench_once(corpus, out_dir, upsert))
+
+	# Best-of-N per stage is the least noisy number to compare across commits
+	best: Dict[str, Dict[str, Any]] = {}
+	for run in runs:
+		for stage, st in run["stages"].items():
+			if stage not in best or st["seconds"] < best[stage]["seconds"]:
+				best[stage] = st
+
+	result = {
+		"commit": commit,
+		"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+		"python": platform.python_version(),
+		"platform": platform.platform(),
+		"params": {
+			"files": args.files,
+			"file_kb": args.file_kb,
+			"corpus_bytes": corpus_bytes,
+			"dup_ratio": args.dup_ratio,
+			"dim": args.dim,
+			"latency_ms": args.latency_ms,
+			"repeat": args.repeat,
+			"upsert": upsert,
+			"dedup": os.getenv("EMBED_DEDUP", "exact"),
+		},
+		"runs": runs,
+		"best": {stage: st["seconds"] for stage, st in best.items()},
+		"peak_rss_mb": round(peak_rss_mb(), 1),
+	}
+
+	out = args.out or embed.ROOT / "artifacts" / "bench" / f"ingest-{time.strftime('%Y%m%d-%H%M%S')}-{commit}.json"
+	out.parent.mkdir(parents=True, exist_ok=True)
+	out.write_text(json.dumps(result, indent=2), encoding="utf-8")
+
+	print(f"[bench] commit={commit} files={args.files} x {args.file_kb}KB dim={args.dim} latency={args.latency_ms}ms")
+	for stage, st in best.items():
+		print(f"  {stage:<15} {st['seconds']:>9.4f}s  {st['items']:>8} items  {st['items_per_s'] or 0:>12.1f}/s")
+	print(f"[OK] wrote {out}")
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv[1:]))
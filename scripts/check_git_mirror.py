@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# --- Amara Script Metadata ---
+# Repo: amara-core
+# Role: Self-check for sync_repos.py git mirrors against local file:// bare repos (no network)
+# Owner: core
+# Secrets: none
+# Notes: Builds throwaway repos in a temp dir; exercises clone, fetch after push, stage_from_git, refused oid wants
+# --------------------------------
+"""
+check_git_mirror.py
+
+End-to-end check of the persistent partial-clone mirrors in sync_repos.py, run
+against bare repos served over file:// (so --filter/--depth behave like a remote):
+
+  1. first git_mirror() clones; stage_from_git() copies the selected files and
+     reports the symlink and the submodule (gitlink) as denied
+  2. a second run with nothing pushed fetches, and stages nothing
+  3. after a push (edit, delete, add) the mirror fetches the new tip and only the
+     changed blobs are staged; the deleted file is removed
+  4. a server that refuses wants for unadvertised objects (protocol v0, no
+     uploadpack.allowAnySHA1InWant) still stages, via refetch_unfiltered(), both
+     from the object store and with SYNC_GIT_CHECKOUT-style checkout
+
+  python scripts/check_git_mirror.py        # exits 1 if any check fails
+
+Staging goes to the temp dir (DEST_ROOT / STATE_DIR / SYNC_MIRROR_DIR are redirected).
+"""
+
+from __future__ import annotations
+import io
+import os
+import sys
+import subprocess
+import tempfile
+from contextlib import redirect_stderr
+from pathlib import Path
+from typing import Any, Dict, List, Set
+
+import sync_repos
+from sync_repos import PathMatcher
+
+INCLUDES = ["README.md", "docs/*", "link.md", "vendor/*"]
+EXCLUDES: List[str] = []
+GIT_ID = ["-c", "user.name=check", "-c", "user.email=check@localhost"]
+
+failures = 0
+
+
+def check(ok: bool, what: str, detail: Any = "") -> None:
+    global failures
+    if ok:
+        print(f"[OK] {what}")
+    else:
+        failures += 1
+        print(f"[ERR] {what}{f': {detail}' if detail != '' else ''}", file=sys.stderr)
+
+
+def git(cwd: Path, *args: str) -> str:
+    return subprocess.run(["git", *GIT_ID, *args], cwd=cwd, check=True, stdout=subprocess.PIPE, text=True).stdout
+
+
+def make_origin(root: Path, name: str, *, allow_any_want: bool) -> tuple[Path, str]:
+    """Work repo with files, a symlink and a gitlink, pushed to a bare repo; returns (work, file:// url)."""
+    work = root / f"{name}-work"
+    (work / "docs").mkdir(parents=True)
+    git(work, "init", "-q", "-b", "main")
+    (work / "README.md").write_text("# readme\n", encoding="utf-8")
+    (work / "docs" / "a.md").write_text("alpha\n", encoding="utf-8")
+    (work / "docs" / "b.md").write_text("beta\n", encoding="utf-8")
+    (work / "notes.txt").write_text("not included\n", encoding="utf-8")
+    os.symlink("README.md", work / "link.md")
+    git(work, "add", ".")
+    git(work, "commit", "-q", "-m", "initial")
+    head = git(work, "rev-parse", "HEAD").strip()
+    git(work, "update-index", "--add", "--cacheinfo", f"160000,{head},vendor/sub")
+    git(work, "commit", "-q", "-m", "add submodule")
+    bare = root / f"{name}.git"
+    git(root, "clone", "-q", "--bare", str(work), str(bare))
+    git(bare, "config", "uploadpack.allowfilter", "true")
+    if allow_any_want:
+        git(bare, "config", "uploadpack.allowAnySHA1InWant", "true")
+    git(work, "remote", "add", "origin", str(bare))
+    return work, bare.resolve().as_uri()
+
+
+def notes(res: Dict[str, Any], kind: str) -> Dict[str, str]:
+    return {rec["src"]: rec.get("note", "") for rec in res.get(kind, [])}
+
+
+def stage(name: str, repo: Path, commit: str, dest: str, **kw: Any) -> Dict[str, Any]:
+    return sync_repos.stage_from_git(name, repo, commit, INCLUDES, EXCLUDES, dest, dry=False, ref="main", **kw)
+
+
+def check_mirror(root: Path) -> None:
+    work, url = make_origin(root, "origin", allow_any_want=True)
+    matcher = PathMatcher(INCLUDES, EXCLUDES)
+
+    repo, action, commit = sync_repos.git_mirror("origin", url, "main", matcher, checkout=False)
+    check(action == "cloned", "first run clones the mirror", action)
+    res = stage("origin", repo, commit, "origin")
+    copied = set(notes(res, "copied"))
+    check(copied == {"README.md", "docs/a.md", "docs/b.md"}, "first stage copies the selected blobs", sorted(copied))
+    denied = notes(res, "denied")
+    check(denied == {"link.md": "symlink", "vendor/sub": "submodule"}, "symlink and submodule reported as denied", denied)
+    dest = sync_repos.DEST_ROOT / "origin"
+    check((dest / "docs" / "a.md").read_text(encoding="utf-8") == "alpha\n", "staged content matches the blob")
+    check(not (dest / "vendor").exists() and not (dest / "link.md").exists(), "denied entries are not staged")
+
+    repo, action, again = sync_repos.git_mirror("origin", url, "main", matcher, checkout=False)
+    check(action == "fetched" and again == commit, "second run fetches the same tip", (action, again[:12]))
+    res = stage("origin", repo, again, "origin")
+    check(res["counts"]["copied"] == 0 and res["counts"]["deleted"] == 0, "unchanged tip stages nothing", res["counts"])
+
+    (work / "docs" / "a.md").write_text("alpha v2\n", encoding="utf-8")
+    (work / "docs" / "b.md").unlink()
+    (work / "docs" / "c.md").write_text("gamma\n", encoding="utf-8")
+    git(work, "add", "-A")
+    git(work, "commit", "-q", "-m", "edit a, drop b, add c")
+    git(work, "push", "-q", "origin", "main")
+    repo, action, new = sync_repos.git_mirror("origin", url, "main", matcher, checkout=False)
+    check(action == "fetched" and new != commit, "fetch after a push moves to the new tip", (action, new[:12]))
+    res = stage("origin", repo, new, "origin")
+    copied: Set[str] = set(notes(res, "copied"))
+    check(copied == {"docs/a.md", "docs/c.md"}, "only changed blobs are staged", sorted(copied))
+    check({Path(rec["dst"]).name for rec in res.get("deleted", [])} == {"b.md"}, "deleted file is removed",
+          res.get("deleted"))
+    check((dest / "docs" / "a.md").read_text(encoding="utf-8") == "alpha v2\n", "edited file has the new content")
+
+
+def check_refused_wants(root: Path) -> None:
+    _, url = make_origin(root, "strict", allow_any_want=False)
+    matcher = PathMatcher(INCLUDES, EXCLUDES)
+    # Protocol v0 enforces uploadpack.allowAnySHA1InWant (v2 accepts any reachable oid)
+    os.environ.update(GIT_CONFIG_COUNT="1", GIT_CONFIG_KEY_0="protocol.version", GIT_CONFIG_VALUE_0="0")
+    try:
+        repo, _, commit = sync_repos.git_mirror("strict", url, "main", matcher, checkout=False)
+        err = io.StringIO()
+        with redirect_stderr(err):
+            res = stage("strict", repo, commit, "strict")
+        check("refused blob wants" in err.getvalue(), "refused oid wants fall back to an unfiltered refetch")
+        check(set(notes(res, "copied")) == {"README.md", "docs/a.md", "docs/b.md"}, "fallback still stages every blob",
+              res["counts"])
+
+        err = io.StringIO()
+        with redirect_stderr(err):
+            repo, _, _ = sync_repos.git_mirror("strict-co", url, "main", matcher, checkout=True)
+        check((repo / "docs" / "b.md").is_file(), "checkout mirror recovers the same way", err.getvalue().strip())
+    finally:
+        for key in ("GIT_CONFIG_COUNT", "GIT_CONFIG_KEY_0", "GIT_CONFIG_VALUE_0"):
+            os.environ.pop(key, None)
+
+
+def main() -> int:
+    with tempfile.TemporaryDirectory(prefix="check_git_mirror_") as td:
+        root = Path(td)
+        os.environ["SYNC_MIRROR_DIR"] = str(root / "mirrors")
+        sync_repos.DEST_ROOT = root / "dest"
+        sync_repos.STATE_DIR = root / "state"
+        check_mirror(root)
+        check_refused_wants(root)
+    if failures:
+        print(f"[ERR] {failures} git mirror check(s) failed", file=sys.stderr)
+        return 1
+    print("[OK] git mirror checks passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# --- Amara Script Metadata ---
+# Repo: amara-core
+# Role: Recall@k of reduced-dimension embeddings (EMBED_DIM) against full-dimension vectors on our corpus
+# Owner: core
+# Secrets: reads $OPENAI_API_KEY if mode=openai (full-dimension corpus embeddings; cached)
+# Notes: Truncate+renormalise is exactly what EMBED_DIM / OpenAI `dimensions` produce, so one full-dim pass covers every candidate
+# --------------------------------
+"""
+dim_recall.py
+
+Embeds the docs/context/ corpus once at the model's full dimension (through the
+embed cache, so reruns are free), then for each candidate dimension truncates and
+renormalises the same vectors and measures how many of the full-dimension top-k
+neighbours survive. Queries are a seeded sample of corpus chunks (each excluded
+from its own results) plus any --queries-file lines.
+
+  python scripts/dim_recall.py                                  # dims 256,512,768,1024 vs full, k=10
+  python scripts/dim_recall.py --dims 128,256,384 -k 20 --target 0.98
+  python scripts/dim_recall.py --queries-file queries.txt --json
+
+Prints recall@k per dimension and the smallest dimension meeting --target; the
+full result goes to artifacts/dim_recall.json. Apply the pick with EMBED_DIM=<d>
+(and qdrant_init.py --recreate, which defaults --dim to EMBED_DIM).
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+import importlib
+from pathlib import Path
+from typing import Any, Dict, List
+
+import embed
+
+try:
+	np = importlib.import_module("numpy")
+except Exception:
+	print("[ERR] numpy not installed: pip install numpy", file=sys.stderr)
+	sys.exit(2)
+
+QUERY_BLOCK = 256  # queries per matmul, as in search_local.py
+
+
+def normalize(m: Any) -> Any:
+	norms = np.linalg.norm(m, axis=1, keepdims=True)
+	norms[norms == 0] = 1.0
+	return m / norms
+
+
+def top_k(queries: Any, matrix: Any, k: int, self_rows: List[int]) -> Any:
+	"""Indices of the k best cosine matches per query; self_rows[i] >= 0 is masked out for query i."""
+	out = np.empty((len(queries), k), dtype=np.int64)
+	for start in range(0, len(queries), QUERY_BLOCK):
+		scores = queries[start : start + QUERY_BLOCK] @ matrix.T
+		for i, row in enumerate(self_rows[start : start + QUERY_BLOCK]):
+			if row >= 0:
+				scores[i, row] = -np.inf
+		out[start : start + QUERY_BLOCK] = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+	return out
+
+
+def recall_at_k(truth: Any, got: Any) -> Any:
+	"""Per-query |truth ∩ got| / k (neighbour order does not matter)."""
+	k = truth.shape[1]
+	return np.array([len(set(t.tolist()) & set(g.tolist())) / k for t, g in zip(truth, got)])
+
+
+def main(argv: List[str]) -> int:
+	parser = argparse.ArgumentParser(description="Recall@k of truncated embeddings vs full dimension on docs/context/.")
+	parser.add_argument("--dims", default="256,512,768,1024", help="Comma-separated candidate dimensions")
+	parser.add_argument("-k", "--top-k", type=int, default=10)
+	parser.add_argument("--sample", type=int, default=200, help="Corpus chunks used as queries (0 = none)")
+	parser.add_argument("--queries-file", type=Path, help="Extra text queries, one per line")
+	parser.add_argument("--target", type=float, default=0.95, help="Recall@k the recommended dimension must reach")
+	parser.add_argument("--seed", type=int, default=13)
+	parser.add_argument("--json", action="store_true", help="Print the result JSON instead of a table")
+	args = parser.parse_args(argv)
+
+	mode = embed.resolve_mode()
+	if mode not in embed.EMBEDDERS:
+		print(f"[ERR] EMBED_MODE={mode} cannot embed; use: {' | '.join(embed.EMBEDDERS)}", file=sys.stderr)
+		return 2
+	# The reference must be the model's native output, whatever EMBED_DIM the runs use
+	current_dim = embed.target_dim()
+	os.environ.pop("EMBED_DIM", None)
+
+	texts: List[str] = []
+	seen: set = set()
+	for _, ch, entry in embed.iter_chunks(embed.iter_files()):
+		if entry["hash"] not in seen:
+			seen.add(entry["hash"])
+			texts.append(ch)
+	if not texts:
+		print("[WARN] No files found under docs/context/")
+		return 0
+
+	full = np.asarray(embed.embed_texts(texts, mode), dtype=np.float32)
+	full_dim = full.shape[1]
+	k = min(args.top_k, len(texts) - 1)
+	if k <= 0:
+		print("[ERR] need at least two distinct chunks to measure recall", file=sys.stderr)
+		return 1
+
+	rng = random.Random(args.seed)
+	rows = sorted(rng.sample(range(len(texts)), min(args.sample, len(texts))))
+	queries = full[rows]
+	self_rows = list(rows)
+	if args.queries_file:
+		extra = [q.strip() for q in args.queries_file.read_text(encoding="utf-8").splitlines() if q.strip()]
+		if extra:
+			queries = np.vstack([queries, np.asarray(embed.embed_texts(extra, mode), dtype=np.float32)])
+			self_rows += [-1] * len(extra)
+	if not len(queries):
+		print("[ERR] no queries (use --sample > 0 or --queries-file)", file=sys.stderr)
+		return 1
+
+	truth = top_k(normalize(queries), normalize(full), k, self_rows)
+	dims = sorted({int(d) for d in args.dims.split(",") if d.strip() and 0 < int(d) < full_dim})
+	results: List[Dict[str, Any]] = []
+	for d in dims + [full_dim]:
+		got = top_k(normalize(queries[:, :d]), normalize(full[:, :d]), k, self_rows)
+		rec = recall_at_k(truth, got)
+		results.append({
+			"dim": d,
+			"recall_at_k": round(float(rec.mean()), 4),
+			"recall_p10": round(float(np.percentile(rec, 10)), 4),
+			"corpus_vector_mb": round(len(texts) * d * 4 / 1e6, 2),
+			"size_ratio": round(d / full_dim, 3),
+		})
+	pick = next((r["dim"] for r in results if r["recall_at_k"] >= args.target), full_dim)
+
+	report = {
+		"model": embed.embed_model_key(mode),
+		"full_dim": full_dim,
+		"current_embed_dim": current_dim,
+		"chunks": len(texts),
+		"queries": len(queries),
+		"k": k,
+		"target": args.target,
+		"recommended_dim": pick,
+		"results": results,
+	}
+	out = embed.OUT / "dim_recall.json"
+	out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+	if args.json:
+		print(json.dumps(report, indent=2))
+		return 0
+	print(f"[dim] {report['model']}: {len(texts)} chunks, {len(queries)} queries, recall@{k} vs {full_dim} dims")
+	for r in results:
+		mark = "  <- smallest meeting target" if r["dim"] == pick else ""
+		print(
+			f"  dim={r['dim']:>5}  recall@{k}={r['recall_at_k']:.4f}  p10={r['recall_p10']:.4f}  "
+			f"vectors={r['corpus_vector_mb']:.2f}MB ({r['size_ratio']:.0%}){mark}"
+		)
+	print(f"[OK] recommended EMBED_DIM={pick} (target recall@{k} >= {args.target}); wrote {out}")
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv[1:]))
@@ -4,19 +4,33 @@
 # Role: Embed files in docs/context/ and (optionally) upsert to Qdrant
 # Owner: core
 # Secrets: reads $OPENAI_API_KEY if mode=openai
-# Notes: Modes: openai | local | dry. Uses runtime imports to keep deps optional.
+# Notes: Modes: openai | local | fake | dry. Uses runtime imports to keep deps optional.
+#        Embeddings are cached on disk by (model, sha256(text)); see EMBED_CACHE_* env.
+#        Finished batches are checkpointed so an interrupted run resumes; see EMBED_CHECKPOINT*.
 # --------------------------------
 
 import os
 import sys
 import json
+import atexit
 import uuid
+import mmap
+import struct
+import sqlite3
+import random
 import hashlib
 import pathlib
+import shutil
 import importlib
-from typing import List, Dict, Any, Tuple
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Dict, Any, Optional, Tuple
 from pathlib import Path
 
+from lib.metrics import RunMetrics
+
 def ensure_dir(p: Path) -> None:
     """
     Ensure p is a directory.
@@ -46,16 +60,19 @@ CTX = ROOT / "docs" / "context"
 OUT = ROOT / "artifacts"
 ensure_dir(OUT)
 
+# Per-stage timings for this run; main() writes artifacts/embed.metrics.{json,prom}
+METRICS = RunMetrics("embed")
+
 
 # ---------- helpers ----------
-def iter_files() -> List[pathlib.Path]:
-	"""Collect text-like files under docs/context/ (allowlist)."""
-	exts = {".md", ".yaml", ".yml", ".txt", ".conf", ".html", ".js", ".ts", ".sh", ".py"}
-	files: List[pathlib.Path] = []
+TEXT_EXTS = {".md", ".yaml", ".yml", ".txt", ".conf", ".html", ".js", ".ts", ".sh", ".py"}
+
+
+def iter_files() -> Iterator[pathlib.Path]:
+	"""Yield text-like files under docs/context/ (allowlist), lazily."""
 	for p in CTX.rglob("*"):
-		if p.is_file() and p.suffix.lower() in exts:
-			files.append(p)
-	return files
+		if p.is_file() and p.suffix.lower() in TEXT_EXTS:
+			yield p
 
 
 def load_text(p: pathlib.Path) -> str:
@@ -84,11 +101,655 @@ def write_manifest(records: List[Dict[str, Any]], name: str) -> None:
 	print(f"[OK] wrote {outp}")
 
 
+class JsonArrayWriter:
+	"""Write a JSON array one element at a time (streaming counterpart of write_manifest)."""
+
+	def __init__(self, name: str) -> None:
+		self.path = OUT / name
+		self._fh = self.path.open("w", encoding="utf-8")
+		self._fh.write("[")
+		self.count = 0
+
+	def write(self, records: Iterable[Dict[str, Any]]) -> None:
+		for r in records:
+			self._fh.write(",\n  " if self.count else "\n  ")
+			self._fh.write(json.dumps(r))
+			self.count += 1
+
+	def close(self) -> None:
+		self._fh.write("\n]\n" if self.count else "]\n")
+		self._fh.close()
+		print(f"[OK] wrote {self.path} ({self.count} records)")
+
+
+# ---------- binary vector artifact ----------
+VECTORS_NPY = "chunks.embeddings.npy"
+VECTORS_INDEX = "chunks.embeddings.index.json"
+_NPY_HEADER_LEN = 128  # fixed, 64-byte aligned, so the shape can be patched in place at close
+
+
+def _npy_header(count: int, dim: int) -> bytes:
+	header = "{'descr': '<f4', 'fortran_order': False, 'shape': (%d, %d), }" % (count, dim)
+	body_len = _NPY_HEADER_LEN - 10  # magic(6) + version(2) + header_len(2)
+	header = header.ljust(body_len - 1) + "\n"
+	return b"\x93NUMPY\x01\x00" + struct.pack("<H", body_len) + header.encode("latin1")
+
+
+class VectorArtifactWriter:
+	"""
+	Append-only writer for the binary vector artifact:
+	  chunks.embeddings.npy         float32 (N, dim) matrix in .npy v1.0 format (mmap-able)
+	  chunks.embeddings.index.json  id/offset table: row i of the matrix is ids[i]
+	Files are written under a .tmp suffix and swapped in atomically on close().
+	"""
+
+	def __init__(self, out_dir: Optional[Path] = None) -> None:
+		out_dir = out_dir or OUT
+		self.npy_path = out_dir / VECTORS_NPY
+		self.index_path = out_dir / VECTORS_INDEX
+		self._tmp = self.npy_path.with_suffix(".npy.tmp")
+		self._fh = self._tmp.open("wb")
+		self.dim = 0
+		self.ids: List[str] = []
+		self.lens: List[int] = []
+
+	def write(self, records: Iterable[Dict[str, Any]]) -> None:
+		for r in records:
+			vec = array("f", r["embedding"])
+			if not self.dim:
+				self.dim = len(vec)
+				self._fh.write(_npy_header(0, self.dim))
+			if len(vec) != self.dim:
+				raise ValueError(f"vector dim mismatch for {r['id']}: {len(vec)} != {self.dim}")
+			if sys.byteorder == "big":
+				vec.byteswap()
+			self._fh.write(vec.tobytes())
+			self.ids.append(r["id"])
+			self.lens.append(r["len"])
+
+	def close(self) -> None:
+		if not self.dim:
+			self._fh.write(_npy_header(0, 0))
+		self._fh.seek(0)
+		self._fh.write(_npy_header(len(self.ids), self.dim))
+		self._fh.close()
+		os.replace(self._tmp, self.npy_path)
+		index = {
+			"format": "amara-vectors/1",
+			"dtype": "float32",
+			"dim": self.dim,
+			"count": len(self.ids),
+			"matrix": VECTORS_NPY,
+			"ids": self.ids,
+			"lens": self.lens,
+		}
+		self.index_path.write_text(json.dumps(index, separators=(",", ":")), encoding="utf-8")
+		print(f"[OK] wrote {self.npy_path} ({len(self.ids)} x {self.dim} float32)")
+
+
+class VectorRows:
+	"""
+	Row access over a flat float32 memoryview (numpy-free fallback): rows[i] is a 1-D
+	memoryview of row i. memoryview cannot index rows of a 2-D cast, hence the slicing.
+	"""
+
+	def __init__(self, data: memoryview, count: int, dim: int) -> None:
+		self._data = data
+		self.shape = (count, dim)
+
+	def __len__(self) -> int:
+		return self.shape[0]
+
+	def __getitem__(self, i: int) -> memoryview:
+		count, dim = self.shape
+		if i < 0:
+			i += count
+		if not 0 <= i < count:
+			raise IndexError(f"row {i} out of range for {count} vectors")
+		return self._data[i * dim : (i + 1) * dim]
+
+	def __iter__(self) -> Iterator[memoryview]:
+		for i in range(self.shape[0]):
+			yield self[i]
+
+
+def open_vector_artifact(out_dir: Optional[Path] = None) -> Tuple[List[str], Any]:
+	"""
+	Memory-map the binary vector artifact; returns (ids, matrix) where matrix[i] is ids[i].
+	Uses numpy.load(mmap_mode="r") when numpy is installed, otherwise VectorRows over a
+	read-only mmap. Either way no vector data is parsed or copied.
+	"""
+	out_dir = out_dir or OUT
+	index = json.loads((out_dir / VECTORS_INDEX).read_text(encoding="utf-8"))
+	npy_path = out_dir / index.get("matrix", VECTORS_NPY)
+	try:
+		np = importlib.import_module("numpy")
+	except Exception:
+		np = None
+	if np is not None:
+		return index["ids"], np.load(npy_path, mmap_mode="r")
+
+	with npy_path.open("rb") as fh:
+		mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+	header_len = struct.unpack("<H", mm[8:10])[0]
+	count, dim = index["count"], index["dim"]
+	data = memoryview(mm)[10 + header_len :]
+	if not count or not dim:
+		return index["ids"], []
+	return index["ids"], VectorRows(data.cast("f"), count, dim)
+
+
+def write_vectors(records: List[Dict[str, Any]]) -> None:
+	"""Write the binary vector artifact (and the legacy JSON only if EMBED_JSON=1)."""
+	writer = VectorArtifactWriter()
+	writer.write(records)
+	writer.close()
+	if os.getenv("EMBED_JSON", "0") == "1":
+		write_manifest(records, "chunks.embeddings.json")
+
+
+def iter_chunks(files: Iterable[pathlib.Path]) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+	"""Yield (doc_id, chunk_text, manifest_entry) for every non-empty file, one file in memory at a time."""
+	for p in files:
+		text = load_text(p)
+		if not text.strip():
+			continue
+		for i, ch in enumerate(chunk_text(text)):
+			doc_id = sha1(f"{p.as_posix()}::{i}")
+			yield doc_id, ch, {"file": p.as_posix(), "chunk": i, "id": doc_id, "len": len(ch), "hash": sha1(ch)}
+
+
+def batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+	batch: List[Any] = []
+	for item in items:
+		batch.append(item)
+		if len(batch) >= size:
+			yield batch
+			batch = []
+	if batch:
+		yield batch
+
+
+class ChunkDeduper:
+	"""
+	Collapse duplicate chunks onto one representative before embedding.
+	  exact: identical text (sha1 of the chunk)
+	  near:  additionally MinHash (32 perms over 5-word shingles) with LSH banding
+	         (8 bands x 4 rows); a candidate matches when the estimated Jaccard
+	         similarity is >= threshold
+	Duplicates take the representative's id, so they share its vector and point.
+	"""
+
+	NUM_PERM = 32
+	BANDS = 8
+	SHINGLE = 5
+
+	def __init__(self, near: bool, threshold: float = 0.9) -> None:
+		self.near = near
+		self.threshold = threshold
+		self.counts = {"exact": 0, "near": 0}
+		self.dups: Dict[str, List[Dict[str, Any]]] = {}  # rep id -> duplicate locations
+		self._by_hash: Dict[str, str] = {}
+		self._loc: Dict[str, Dict[str, Any]] = {}
+		self._sigs: Dict[str, Tuple[int, ...]] = {}
+		self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[str]] = {}
+
+	@classmethod
+	def from_env(cls) -> Optional["ChunkDeduper"]:
+		"""EMBED_DEDUP=exact (default) | near | off; EMBED_DEDUP_THRESHOLD (default 0.9)."""
+		mode = os.getenv("EMBED_DEDUP", "exact")
+		if mode == "off":
+			return None
+		if mode not in ("exact", "near"):
+			raise RuntimeError(f"Unknown EMBED_DEDUP={mode}; use: exact | near | off")
+		return cls(near=mode == "near", threshold=float(os.getenv("EMBED_DEDUP_THRESHOLD", "0.9")))
+
+	@classmethod
+	def minhash(cls, text: str) -> Tuple[int, ...]:
+		words = text.split()
+		n = cls.SHINGLE
+		shingles = {" ".join(words[i : i + n]) for i in range(max(1, len(words) - n + 1))}
+		rows = []
+		for sh in shingles:
+			b = sh.encode("utf-8")
+			# Two salted 64-byte blake2b digests = 32 independent uint32 hash values per shingle
+			row = array("I")
+			row.frombytes(
+				hashlib.blake2b(b, digest_size=64, salt=b"amara-mh-0").digest()
+				+ hashlib.blake2b(b, digest_size=64, salt=b"amara-mh-1").digest()
+			)
+			rows.append(row)
+		return tuple(min(col) for col in zip(*rows))
+
+	def _bands(self, sig: Tuple[int, ...]) -> Iterator[Tuple[int, Tuple[int, ...]]]:
+		rows = self.NUM_PERM // self.BANDS
+		for b in range(self.BANDS):
+			yield b, sig[b * rows : (b + 1) * rows]
+
+	def _near_match(self, sig: Tuple[int, ...]) -> Optional[str]:
+		seen: set = set()
+		for key in self._bands(sig):
+			for cand in self._buckets.get(key, ()):
+				if cand in seen:
+					continue
+				seen.add(cand)
+				same = sum(1 for x, y in zip(sig, self._sigs[cand]) if x == y)
+				if same / self.NUM_PERM >= self.threshold:
+					return cand
+		return None
+
+	def check(self, entry: Dict[str, Any], text: str) -> bool:
+		"""
+		True if this chunk duplicates an earlier one; the manifest entry is then
+		rewritten to point at the representative (`id`) and tagged `duplicate`.
+		"""
+		rep = self._by_hash.get(entry["hash"])
+		kind = "exact"
+		sig = None
+		if rep is None and self.near:
+			sig = self.minhash(text)
+			rep = self._near_match(sig)
+			kind = "near"
+		if rep is None:
+			self._by_hash[entry["hash"]] = entry["id"]
+			self._loc[entry["id"]] = {"file": entry["file"], "chunk": entry["chunk"]}
+			if sig is not None:
+				self._sigs[entry["id"]] = sig
+				for key in self._bands(sig):
+					self._buckets.setdefault(key, []).append(entry["id"])
+			return False
+		self._by_hash.setdefault(entry["hash"], rep)
+		self.counts[kind] += 1
+		self.dups.setdefault(rep, []).append({"file": entry["file"], "chunk": entry["chunk"]})
+		entry["id"], entry["duplicate"] = rep, kind
+		return True
+
+	def locations(self, rep: str) -> List[Dict[str, Any]]:
+		return [self._loc[rep]] + self.dups.get(rep, [])
+
+	def report(self) -> None:
+		unique = len(self._loc)
+		total = unique + self.counts["exact"] + self.counts["near"]
+		print(f"[OK] dedup: {total} chunks -> {unique} unique (exact={self.counts['exact']} near={self.counts['near']})")
+
+
+# ---------- embedding cache ----------
+class EmbedCache:
+	"""
+	Persistent, content-addressed embedding cache (stdlib sqlite3).
+	Key: sha256(model_key + NUL + chunk text) -> float32 vector blob.
+	Least-recently-used rows are evicted once stored vectors exceed max_bytes.
+	"""
+
+	def __init__(self, path: Path, max_bytes: int) -> None:
+		self.path = path
+		self.max_bytes = max_bytes
+		self.hits = 0
+		self.misses = 0
+		self.evicted = 0
+		self._lock = threading.Lock()
+		self._db = sqlite3.connect(str(path), check_same_thread=False)
+		self._db.execute("PRAGMA journal_mode=WAL")
+		self._db.execute(
+			"CREATE TABLE IF NOT EXISTS embeddings ("
+			" key TEXT PRIMARY KEY, vec BLOB NOT NULL, nbytes INTEGER NOT NULL, used REAL NOT NULL)"
+		)
+		self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_used ON embeddings(used)")
+		self._db.commit()
+
+	@staticmethod
+	def key(model_key: str, text: str) -> str:
+		return hashlib.sha256(f"{model_key}\0{text}".encode("utf-8")).hexdigest()
+
+	def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+		keys = list(keys)
+		found: Dict[str, List[float]] = {}
+		now = time.time()
+		with self._lock:
+			# Stay well under SQLite's bound-variable limit
+			for i in range(0, len(keys), 500):
+				part = keys[i : i + 500]
+				marks = ",".join("?" * len(part))
+				rows = self._db.execute(f"SELECT key, vec FROM embeddings WHERE key IN ({marks})", part).fetchall()
+				for k, blob in rows:
+					vec = array("f")
+					vec.frombytes(blob)
+					found[k] = vec.tolist()
+				if rows:
+					self._db.executemany("UPDATE embeddings SET used=? WHERE key=?", [(now, k) for k, _ in rows])
+			self._db.commit()
+		return found
+
+	def put_many(self, items: Dict[str, List[float]]) -> None:
+		now = time.time()
+		rows = []
+		for k, vec in items.items():
+			blob = array("f", vec).tobytes()
+			rows.append((k, blob, len(blob), now))
+		with self._lock:
+			self._db.executemany("INSERT OR REPLACE INTO embeddings (key, vec, nbytes, used) VALUES (?, ?, ?, ?)", rows)
+			self._db.commit()
+
+	def evict(self) -> None:
+		"""Drop least-recently-used rows until the cache fits in max_bytes."""
+		with self._lock:
+			total = self._db.execute("SELECT COALESCE(SUM(nbytes), 0) FROM embeddings").fetchone()[0]
+			if total <= self.max_bytes:
+				return
+			doomed: List[Tuple[str]] = []
+			for k, nbytes in self._db.execute("SELECT key, nbytes FROM embeddings ORDER BY used ASC"):
+				if total <= self.max_bytes:
+					break
+				doomed.append((k,))
+				total -= nbytes
+			self._db.executemany("DELETE FROM embeddings WHERE key=?", doomed)
+			self._db.commit()
+			self.evicted += len(doomed)
+
+	def close(self) -> None:
+		self.evict()
+		self._db.close()
+
+
+_CACHE: Optional[EmbedCache] = None
+
+
+def get_embed_cache() -> Optional[EmbedCache]:
+	"""
+	Open the shared embedding cache (lazily, once per process).
+	Env: EMBED_CACHE=0 disables; EMBED_CACHE_PATH, EMBED_CACHE_MAX_MB (default 1024).
+	"""
+	global _CACHE
+	if os.getenv("EMBED_CACHE", "1") == "0":
+		return None
+	if _CACHE is None:
+		path = Path(os.getenv("EMBED_CACHE_PATH") or OUT / "embed_cache.sqlite3")
+		max_mb = int(os.getenv("EMBED_CACHE_MAX_MB", "1024"))
+		_CACHE = EmbedCache(path, max_bytes=max_mb * 1024 * 1024)
+	return _CACHE
+
+
+def target_dim() -> Optional[int]:
+	"""EMBED_DIM: reduced output dimension (Matryoshka-style); unset means the model's native size."""
+	raw = os.getenv("EMBED_DIM", "").strip()
+	return int(raw) if raw else None
+
+
+def reduce_dim(vec: List[float], dim: int) -> List[float]:
+	"""Keep the first `dim` components and renormalise to unit length."""
+	if len(vec) < dim:
+		raise RuntimeError(f"EMBED_DIM={dim} exceeds the model's {len(vec)} dimensions")
+	head = vec[:dim]
+	norm = sum(x * x for x in head) ** 0.5 or 1.0
+	return [x / norm for x in head]
+
+
+def cached_embed(
+	texts: List[str],
+	model_key: str,
+	embed_fn: Callable[[List[str]], List[List[float]]],
+) -> List[List[float]]:
+	"""
+	Return one vector per text, calling embed_fn only for texts not already cached
+	under model_key. Identical texts within a call are embedded once. With EMBED_DIM
+	set, vectors longer than that are truncated and renormalised before caching.
+	"""
+	dim = target_dim()
+	if dim:
+		native_fn = embed_fn
+
+		def embed_fn(inputs: List[str]) -> List[List[float]]:
+			return [v if len(v) == dim else reduce_dim(v, dim) for v in native_fn(inputs)]
+
+	cache = get_embed_cache()
+	if cache is None:
+		return embed_fn(texts) if texts else []
+
+	keys = [EmbedCache.key(model_key, t) for t in texts]
+	found = cache.get_many(set(keys))
+	cache.hits += sum(1 for k in keys if k in found)
+
+	missing: Dict[str, str] = {}
+	for k, t in zip(keys, texts):
+		if k not in found and k not in missing:
+			missing[k] = t
+	cache.misses += len(missing)
+
+	if missing:
+		vecs = embed_fn(list(missing.values()))
+		fresh = dict(zip(missing.keys(), vecs))
+		cache.put_many(fresh)
+		found.update(fresh)
+	return [found[k] for k in keys]
+
+
+def trim_embed_cache() -> None:
+	"""Evict down to EMBED_CACHE_MAX_MB now (long-running processes; others evict at close)."""
+	if _CACHE is not None:
+		_CACHE.evict()
+
+
+def report_cache_stats() -> None:
+	if _CACHE is None:
+		return
+	_CACHE.close()
+	METRICS.inc("cache_hits", _CACHE.hits)
+	METRICS.inc("cache_misses", _CACHE.misses)
+	print(f"[OK] embed cache: hits={_CACHE.hits} misses={_CACHE.misses} evicted={_CACHE.evicted} ({_CACHE.path})")
+
+
+# ---------- resumable runs ----------
+CHECKPOINT_DIR = "embed.checkpoint"
+
+
+class EmbedCheckpoint:
+	"""
+	Durable log of finished embedding batches under artifacts/embed.checkpoint/:
+	  vectors.f32    float32 rows, appended per batch
+	  records.jsonl  one {"id", "hash", "len"} line per row, appended after its vectors
+	  meta.json      model key and dim; a checkpoint from another model is discarded
+	Both files are fsynced per batch. A row counts once its JSONL line is complete,
+	so a torn tail left by a crash is truncated away when the next run loads it.
+	On resume only the id -> row index is held in memory; vectors.f32 is mmapped
+	and rows are read on demand. The directory is removed after a run finishes.
+	"""
+
+	def __init__(self, model: str, out_dir: Optional[Path] = None, batch_size: int = 2048) -> None:
+		self.dir = (out_dir or OUT) / CHECKPOINT_DIR
+		self.model = model
+		self.batch_size = max(1, batch_size)
+		self.dim = 0
+		self.resumed = 0
+		self.appended = 0
+		self._rows: Dict[str, Tuple[Optional[str], int]] = {}  # id -> (hash, row)
+		self._map: Optional[mmap.mmap] = None
+		self._vec_fh: Any = None
+		self._rec_fh: Any = None
+		self._load()
+
+	@classmethod
+	def from_env(cls, mode: str) -> Optional["EmbedCheckpoint"]:
+		"""EMBED_CHECKPOINT=1 (default; 0 disables), EMBED_CHECKPOINT_BATCH (chunks per durable batch, 2048)."""
+		if mode == "dry" or os.getenv("EMBED_CHECKPOINT", "1") == "0":
+			return None
+		return cls(embed_model_key(mode), batch_size=int(os.getenv("EMBED_CHECKPOINT_BATCH", "2048")))
+
+	def _load(self) -> None:
+		meta_path = self.dir / "meta.json"
+		if not meta_path.exists():
+			return
+		try:
+			meta = json.loads(meta_path.read_text(encoding="utf-8"))
+		except ValueError:
+			meta = {}
+		if meta.get("model") != self.model or not meta.get("dim"):
+			print(f"[WARN] discarding checkpoint from another model ({meta.get('model')}) at {self.dir}")
+			self.clear()
+			return
+		self.dim = int(meta["dim"])
+		rec_path, vec_path = self.dir / "records.jsonl", self.dir / "vectors.f32"
+		row_bytes = 4 * self.dim
+		max_rows = (vec_path.stat().st_size if vec_path.exists() else 0) // row_bytes
+		keep = 0
+		n = 0
+		if rec_path.exists():
+			with rec_path.open("rb") as fh:
+				for line in fh:
+					if n >= max_rows or not line.endswith(b"\n"):  # torn last line
+						break
+					try:
+						row = json.loads(line)
+					except ValueError:
+						break
+					self._rows[row["id"]] = (row.get("hash"), n)
+					n += 1
+					keep += len(line)
+		# Drop anything past the last complete row so appends continue cleanly
+		with rec_path.open("ab") as fh:
+			fh.truncate(keep)
+		with vec_path.open("ab") as fh:
+			fh.truncate(n * row_bytes)
+		if n:
+			with vec_path.open("rb") as fh:
+				self._map = mmap.mmap(fh.fileno(), n * row_bytes, access=mmap.ACCESS_READ)
+			print(f"[INFO] checkpoint: {n} embedded chunks available from an interrupted run ({self.dir})")
+
+	def get(self, doc_id: str, text_hash: str) -> Optional[List[float]]:
+		"""Checkpointed vector for this chunk, if its text is unchanged since it was embedded."""
+		hit = self._rows.get(doc_id)
+		if hit is None or hit[0] != text_hash:
+			return None
+		self.resumed += 1
+		row_bytes = 4 * self.dim
+		with memoryview(self._map)[hit[1] * row_bytes : (hit[1] + 1) * row_bytes] as raw, raw.cast("f") as vec:
+			return vec.tolist()
+
+	def append(self, records: List[Dict[str, Any]]) -> None:
+		"""Durably record a finished batch (vectors first, then the rows that make them visible)."""
+		if not records:
+			return
+		if self._vec_fh is None:
+			ensure_dir(self.dir)
+			if not self.dim:
+				self.dim = len(records[0]["embedding"])
+				tmp = self.dir / "meta.json.tmp"
+				tmp.write_text(json.dumps({"model": self.model, "dim": self.dim}), encoding="utf-8")
+				os.replace(tmp, self.dir / "meta.json")
+			self._vec_fh = (self.dir / "vectors.f32").open("ab")
+			self._rec_fh = (self.dir / "records.jsonl").open("ab")
+		buf = array("f")
+		for r in records:
+			buf.extend(r["embedding"])
+		self._vec_fh.write(buf.tobytes())
+		self._vec_fh.flush()
+		os.fsync(self._vec_fh.fileno())
+		lines = "".join(json.dumps({"id": r["id"], "hash": r.get("hash"), "len": r.get("len")}) + "\n" for r in records)
+		self._rec_fh.write(lines.encode("utf-8"))
+		self._rec_fh.flush()
+		os.fsync(self._rec_fh.fileno())
+		self.appended += len(records)
+
+	def close(self) -> None:
+		for fh in (self._vec_fh, self._rec_fh, self._map):
+			if fh is not None:
+				fh.close()
+		self._vec_fh = self._rec_fh = self._map = None
+
+	def clear(self) -> None:
+		"""Forget the checkpoint (after a successful run, or when it belongs to another model)."""
+		self.close()
+		shutil.rmtree(self.dir, ignore_errors=True)
+		self._rows.clear()
+
+
+# ---------- request batching ----------
+def batch_by_budget(texts: List[str], max_tokens: int, max_items: int) -> List[List[int]]:
+	"""
+	Group text indices into consecutive batches bounded by item count and an
+	estimated token budget (~4 chars per token, same heuristic as chunk_text).
+	"""
+	batches: List[List[int]] = []
+	cur: List[int] = []
+	cur_tokens = 0
+	for i, t in enumerate(texts):
+		n = max(1, len(t) // 4)
+		if cur and (len(cur) >= max_items or cur_tokens + n > max_tokens):
+			batches.append(cur)
+			cur, cur_tokens = [], 0
+		cur.append(i)
+		cur_tokens += n
+	if cur:
+		batches.append(cur)
+	return batches
+
+
+def _is_retryable(e: Exception) -> bool:
+	"""429 / 5xx responses and connection-level failures are worth retrying."""
+	status = getattr(e, "status_code", None)
+	if status is None:
+		if type(e).__module__.startswith("grpc") and callable(getattr(e, "code", None)):
+			return getattr(e.code(), "name", "") in ("UNAVAILABLE", "RESOURCE_EXHAUSTED", "DEADLINE_EXCEEDED")
+		# openai.APIConnectionError (and its APITimeoutError subclass) and qdrant's
+		# ResponseHandlingException wrap connection failures and carry no status
+		return any(c.__name__ in ("APIConnectionError", "ResponseHandlingException") for c in type(e).__mro__)
+	return status == 429 or status >= 500
+
+
+def call_with_retries(fn: Callable[[], Any], *, retries: int, base_delay: float = 1.0, max_delay: float = 60.0) -> Any:
+	"""Call fn, retrying retryable errors with jittered exponential backoff (honors Retry-After)."""
+	for attempt in range(retries + 1):
+		try:
+			return fn()
+		except Exception as e:
+			if attempt >= retries or not _is_retryable(e):
+				raise
+			delay = min(max_delay, base_delay * (2 ** attempt)) * (0.5 + random.random() / 2)
+			response = getattr(e, "response", None)
+			headers = getattr(response, "headers", None) or {}
+			retry_after = headers.get("retry-after")
+			if retry_after:
+				try:
+					delay = max(delay, float(retry_after))
+				except ValueError:
+					pass
+			print(f"[WARN] request failed ({type(e).__name__}); retry {attempt + 1}/{retries} in {delay:.1f}s", file=sys.stderr)
+			METRICS.inc("retries")
+			time.sleep(delay)
+
+
 # ---------- embedding backends ----------
+def embed_model_key(mode: str) -> str:
+	"""Identity of the vectors a backend produces: embed cache key prefix and checkpoint guard."""
+	if mode == "openai":
+		key = f"openai:{os.getenv('OPENAI_EMBED_MODEL', 'text-embedding-3-small')}"
+	elif mode == "local":
+		key = f"local:{os.getenv('LOCAL_EMBED_MODEL', 'sentence-transformers/all-MiniLM-L6-v2')}"
+	elif mode == "fake":
+		key = f"fake:{int(os.getenv('EMBED_FAKE_DIM', '1536'))}"
+	else:
+		key = mode
+	dim = target_dim()
+	return f"{key}@{dim}" if dim else key
+
+
+_OPENAI: Dict[str, Any] = {}
+
+
+def _openai_client(OpenAI: Any, api_key: str) -> Any:
+	"""One client (and HTTP connection pool) per process, reused across calls (watch mode, MCP adapter)."""
+	if _OPENAI.get("key") != api_key:
+		# Retries are ours (with backoff across the pool), not the SDK's
+		_OPENAI.update(key=api_key, client=OpenAI(api_key=api_key, max_retries=0))
+	return _OPENAI["client"]
+
+
 def try_openai_embed(chunks: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
 	"""
 	OpenAI embeddings (fast, cheap default).
 	Requires: pip install openai; env OPENAI_API_KEY set.
+	Inputs are split by OPENAI_EMBED_BATCH_TOKENS / OPENAI_EMBED_BATCH_SIZE and sent with
+	up to OPENAI_EMBED_CONCURRENCY requests in flight; 429/5xx are retried with backoff.
+	With EMBED_DIM, text-embedding-3-* models return the reduced size directly (`dimensions`).
 	"""
 	api_key = os.getenv("OPENAI_API_KEY")
 	if not api_key:
@@ -102,12 +763,37 @@ def try_openai_embed(chunks: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
 		raise RuntimeError("openai package not installed: pip install openai") from e
 
 	OpenAI = getattr(openai_mod, "OpenAI")
-	client = OpenAI(api_key=api_key)
 	model = os.getenv("OPENAI_EMBED_MODEL", "text-embedding-3-small")
 
-	inputs = [t for _, t in chunks]
-	resp = client.embeddings.create(model=model, input=inputs)
-	vecs = [d.embedding for d in resp.data]
+	max_tokens = int(os.getenv("OPENAI_EMBED_BATCH_TOKENS", "100000"))
+	max_items = int(os.getenv("OPENAI_EMBED_BATCH_SIZE", "512"))
+	concurrency = max(1, int(os.getenv("OPENAI_EMBED_CONCURRENCY", "4")))
+	retries = int(os.getenv("OPENAI_EMBED_MAX_RETRIES", "6"))
+	dim = target_dim()
+	# Server-side shortening is the same truncate+renormalise, minus the wasted bytes
+	extra = {"dimensions": dim} if dim and model.startswith("text-embedding-3") else {}
+
+	def _embed(inputs: List[str]) -> List[List[float]]:
+		client = _openai_client(OpenAI, api_key)
+		batches = batch_by_budget(inputs, max_tokens, max_items)
+		print(f"[INFO] openai: {len(inputs)} inputs in {len(batches)} batches (concurrency={concurrency})")
+
+		def _run(idx: List[int]) -> List[List[float]]:
+			resp = call_with_retries(
+				lambda: client.embeddings.create(model=model, input=[inputs[i] for i in idx], **extra),
+				retries=retries,
+			)
+			return [d.embedding for d in sorted(resp.data, key=lambda d: d.index)]
+
+		out: List[List[float]] = [[] for _ in inputs]
+		with ThreadPoolExecutor(max_workers=concurrency) as pool:
+			# map() yields in submission order, so results land back in input order
+			for idx, vecs in zip(batches, pool.map(_run, batches)):
+				for i, vec in zip(idx, vecs):
+					out[i] = vec
+		return out
+
+	vecs = cached_embed([t for _, t in chunks], embed_model_key("openai"), _embed)
 
 	out: List[Dict[str, Any]] = []
 	for (doc_id, text), vec in zip(chunks, vecs):
@@ -115,10 +801,88 @@ def try_openai_embed(chunks: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
 	return out
 
 
+def fake_vector(text: str, dim: int) -> List[float]:
+	"""Deterministic unit vector derived from blake2b(text); identical text -> identical vector."""
+	raw = bytearray()
+	seed = text.encode("utf-8")
+	block = 0
+	while len(raw) < dim:
+		raw += hashlib.blake2b(seed, digest_size=64, salt=block.to_bytes(8, "little")).digest()
+		block += 1
+	vec = [(b - 127.5) for b in raw[:dim]]
+	norm = sum(x * x for x in vec) ** 0.5 or 1.0
+	return [x / norm for x in vec]
+
+
+def try_fake_embed(chunks: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+	"""
+	Offline, deterministic hash-based embeddings for benchmarks and tests (no model, no network).
+	Env: EMBED_FAKE_DIM (default 1536), EMBED_FAKE_LATENCY_MS (sleep per simulated request, default 0).
+	Requests are shaped like the OpenAI backend (same batching and concurrency settings).
+	"""
+	dim = int(os.getenv("EMBED_FAKE_DIM", "1536"))
+	latency = float(os.getenv("EMBED_FAKE_LATENCY_MS", "0")) / 1000
+	max_tokens = int(os.getenv("OPENAI_EMBED_BATCH_TOKENS", "100000"))
+	max_items = int(os.getenv("OPENAI_EMBED_BATCH_SIZE", "512"))
+	concurrency = max(1, int(os.getenv("OPENAI_EMBED_CONCURRENCY", "4")))
+
+	def _embed(inputs: List[str]) -> List[List[float]]:
+		def _run(idx: List[int]) -> List[List[float]]:
+			if latency:
+				time.sleep(latency)
+			return [fake_vector(inputs[i], dim) for i in idx]
+
+		batches = batch_by_budget(inputs, max_tokens, max_items)
+		out: List[List[float]] = [[] for _ in inputs]
+		with ThreadPoolExecutor(max_workers=concurrency) as pool:
+			for idx, vecs in zip(batches, pool.map(_run, batches)):
+				for i, vec in zip(idx, vecs):
+					out[i] = vec
+		return out
+
+	vecs = cached_embed([t for _, t in chunks], embed_model_key("fake"), _embed)
+
+	out: List[Dict[str, Any]] = []
+	for (doc_id, text), vec in zip(chunks, vecs):
+		out.append({"id": doc_id, "embedding": vec, "len": len(text)})
+	return out
+
+
+_LOCAL: Dict[str, Any] = {}
+
+
+def _stop_local_pool() -> None:
+	pool = _LOCAL.get("pool")
+	if pool is not None:
+		_LOCAL["model"].stop_multi_process_pool(pool)
+		_LOCAL["pool"] = None
+
+
+def _local_model(SentenceTransformer: Any, model_name: str, workers: int) -> Tuple[Any, Any]:
+	"""
+	Load the model once per process and keep it warm across calls (streaming
+	batches, watch mode). With workers > 1 also start a persistent encode pool.
+	"""
+	if _LOCAL.get("name") != model_name:
+		_stop_local_pool()
+		# None lets sentence-transformers pick (CUDA / MPS when available, else CPU)
+		device = os.getenv("LOCAL_EMBED_DEVICE") or None
+		_LOCAL.update(name=model_name, model=SentenceTransformer(model_name, device=device), pool=None)
+	if workers > 1 and _LOCAL["pool"] is None:
+		# Always an explicit list: target_devices=None would size the pool itself (one per GPU, else 4 CPU)
+		device = os.getenv("LOCAL_EMBED_DEVICE") or _LOCAL["model"].device.type
+		devices = [device] * workers
+		_LOCAL["pool"] = _LOCAL["model"].start_multi_process_pool(target_devices=devices)
+		atexit.register(_stop_local_pool)
+	return _LOCAL["model"], _LOCAL["pool"]
+
+
 def try_local_embed(chunks: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
 	"""
-	Local CPU embeddings via sentence-transformers (optional).
+	Local embeddings via sentence-transformers (optional).
 	Requires: pip install 'sentence-transformers'
+	Env: LOCAL_EMBED_WORKERS (encode processes, default 1), LOCAL_EMBED_BATCH (default 64),
+	     LOCAL_EMBED_DEVICE (cpu, cuda, cuda:1, mps, ...; default: picked by the library)
 	"""
 	try:
 		st_mod = importlib.import_module("sentence_transformers")
@@ -127,10 +891,30 @@ def try_local_embed(chunks: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
 
 	SentenceTransformer = getattr(st_mod, "SentenceTransformer")
 	model_name = os.getenv("LOCAL_EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
-	model = SentenceTransformer(model_name)
+	workers = max(1, int(os.getenv("LOCAL_EMBED_WORKERS", "1")))
+	batch_size = max(1, int(os.getenv("LOCAL_EMBED_BATCH", "64")))
+
+	def _embed(texts: List[str]) -> List[List[float]]:
+		# Only pay the model load when something actually misses the cache
+		model, pool = _local_model(SentenceTransformer, model_name, workers)
+		# Length-sorted input keeps each batch (and each worker's share) similarly
+		# sized, so little compute goes to padding
+		order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+		ordered = [texts[i] for i in order]
+		t0 = time.perf_counter()
+		if pool is not None:
+			vecs = model.encode_multi_process(ordered, pool, batch_size=batch_size)
+			vecs = vecs / ((vecs * vecs).sum(axis=1, keepdims=True) ** 0.5)
+		else:
+			vecs = model.encode(ordered, batch_size=batch_size, normalize_embeddings=True)
+		dt = max(time.perf_counter() - t0, 1e-9)
+		print(f"[INFO] local: {len(texts)} chunks in {dt:.2f}s ({len(texts) / dt:.1f} chunks/s; workers={workers}, batch={batch_size})")
+		out: List[List[float]] = [[] for _ in texts]
+		for pos, i in enumerate(order):
+			out[i] = vecs[pos].tolist()
+		return out
 
-	texts = [t for _, t in chunks]
-	vecs = model.encode(texts, normalize_embeddings=True).tolist()
+	vecs = cached_embed([t for _, t in chunks], embed_model_key("local"), _embed)
 
 	out: List[Dict[str, Any]] = []
 	for (doc_id, text), vec in zip(chunks, vecs):
@@ -139,118 +923,593 @@ def try_local_embed(chunks: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
 
 
 # ---------- optional Qdrant upsert ----------
-def maybe_qdrant_upsert(records: List[Dict[str, Any]]) -> None:
+def qdrant_upsert_enabled() -> bool:
+	flag = os.getenv("EMBED_QDRANT_UPSERT", os.getenv("QDRANT_UPSERT", ""))  # back-compat
+	return flag == "1"
+
+
+_QDRANT: Dict[str, Any] = {}
+
+
+def _qdrant() -> Tuple[Any, Any, str]:
 	"""
-	Optional Qdrant upsert (requires qdrant-client).
-	Controlled by env: EMBED_QDRANT_UPSERT=1  (back-compat: QDRANT_UPSERT=1)
-	Honors: QDRANT_URL (preferred, e.g. http://localhost:6333), QDRANT_COLLECTION
+	Return (client, models, collection), creating the client once per process
+	so streaming batches reuse the same connection.
 	"""
-	flag = os.getenv("EMBED_QDRANT_UPSERT", os.getenv("QDRANT_UPSERT", ""))  # back-compat
-	if flag != "1":
-		print("[INFO] Skipping Qdrant upsert (EMBED_QDRANT_UPSERT!=1)")
-		return
+	if not _QDRANT:
+		try:
+			qdrant_mod = importlib.import_module("qdrant_client")
+			http_mod = importlib.import_module("qdrant_client.http")
+		except Exception as e:
+			raise RuntimeError("qdrant-client not installed: pip install qdrant-client") from e
 
-	if not records:
-		print("[INFO] No embeddings to upsert")
-		return
+		QdrantClient = getattr(qdrant_mod, "QdrantClient")
 
-	try:
-		qdrant_mod = importlib.import_module("qdrant_client")
-		http_mod = importlib.import_module("qdrant_client.http")
-	except Exception as e:
-		raise RuntimeError("qdrant-client not installed: pip install qdrant-client") from e
+		# Preferred connection via full URL (e.g., http://qdrant:6333)
+		qdrant_url = os.getenv("QDRANT_URL", "").strip()
+		host = os.getenv("QDRANT_HOST", "qdrant")
+		port = int(os.getenv("QDRANT_PORT", "6333"))
+		# gRPC (port 6334) is much cheaper than REST/JSON for bulk vector uploads
+		grpc = {
+			"prefer_grpc": os.getenv("QDRANT_PREFER_GRPC", "0") == "1",
+			"grpc_port": int(os.getenv("QDRANT_GRPC_PORT", "6334")),
+			# Bounds each request, including the wait=true upsert that drains a bulk load
+			"timeout": int(float(os.getenv("QDRANT_UPSERT_TIMEOUT", "120"))),
+		}
 
-	QdrantClient = getattr(qdrant_mod, "QdrantClient")
-	qm = getattr(http_mod, "models")
+		# QDRANT_LOCATION=":memory:" or a directory runs qdrant-client's embedded local mode (benchmarks, tests)
+		location = os.getenv("QDRANT_LOCATION", "").strip()
 
-	# Preferred connection via full URL (e.g., http://qdrant:6333)
-	qdrant_url = os.getenv("QDRANT_URL", "").strip()
-	host = os.getenv("QDRANT_HOST", "qdrant")
-	port = int(os.getenv("QDRANT_PORT", "6333"))
+		if location == ":memory:":
+			client = QdrantClient(location=location)
+		elif location:
+			client = QdrantClient(path=location)
+		elif qdrant_url:
+			client = QdrantClient(url=qdrant_url, **grpc)
+		else:
+			client = QdrantClient(host=host, port=port, **grpc)
 
-	if qdrant_url:
-		client = QdrantClient(url=qdrant_url)
-	else:
-		client = QdrantClient(host=host, port=port)
+		_QDRANT.update(
+			client=client,
+			models=getattr(http_mod, "models"),
+			collection=os.getenv("QDRANT_COLLECTION", "amara_docs"),
+			ensured=None,
+			transport="local" if location else ("grpc" if grpc["prefer_grpc"] else "rest"),
+		)
+	return _QDRANT["client"], _QDRANT["models"], _QDRANT["collection"]
 
-	collection = os.getenv("QDRANT_COLLECTION", "amara_docs")
 
-	# Ensure collection exists (non-destructive). Avoid recreate_collection.
+def _ensure_collection(client: Any, qm: Any, collection: str, dim: int) -> str:
+	"""
+	Create the collection if missing (non-destructive). Avoid recreate_collection.
+	Uses qdrant_init's settings (on-disk vectors, HNSW, QDRANT_QUANTIZATION) so both
+	entry points create identical collections.
+	"""
+	if _QDRANT.get("ensured"):
+		return "existing"
+	qdrant_init = importlib.import_module("qdrant_init")
 	try:
-		client.get_collection(collection_name=collection)
-		created = False
+		info = client.get_collection(collection_name=collection)
 	except Exception:
 		# Create collection with vector size inferred from first record
-		dim = len(records[0]["embedding"])
 		client.create_collection(
 			collection_name=collection,
-			vectors_config=qm.VectorParams(size=dim, distance=qm.Distance.COSINE),
+			**qdrant_init.collection_kwargs_from_env(dim, qm.Distance.COSINE),
 		)
-		created = True
+		state = "created"
+	else:
+		have = qdrant_init._extract_dim_distance(info)[0]
+		if have not in ("unknown", str(dim)):
+			raise RuntimeError(
+				f"Qdrant::{collection} stores {have}-dim vectors but this run produces {dim} (EMBED_DIM?); "
+				f"run qdrant_init.py --recreate --dim {dim} or set QDRANT_COLLECTION"
+			)
+		state = "existing"
+	_QDRANT["ensured"] = state
+	return state
 
-	def _to_uuid(s: str) -> str:
-		"""
-		Deterministically map our content id (sha1 string) to a UUIDv5,
-		which Qdrant accepts as a valid point ID type.
-		"""
-		return str(uuid.uuid5(uuid.NAMESPACE_URL, s))
 
-	points = [
-		qm.PointStruct(
-			id=_to_uuid(r["id"]),
-			vector=r["embedding"],
-			payload={"source_id": r["id"], "len": r["len"]},
-		)
-		for r in records
+def _to_uuid(s: str) -> str:
+	"""
+	Deterministically map our content id (sha1 string) to a UUIDv5,
+	which Qdrant accepts as a valid point ID type.
+	"""
+	return str(uuid.uuid5(uuid.NAMESPACE_URL, s))
+
+
+def point_payload(r: Dict[str, Any]) -> Dict[str, Any]:
+	"""
+	Payload stored with every point; `hash` (sha1 of the chunk text) and `model`
+	(embed_model_key: backend, model name, EMBED_DIM) together drive reconcile mode.
+	"""
+	payload = {"source_id": r["id"], "len": r["len"]}
+	for key in ("file", "chunk", "hash", "model"):
+		if key in r:
+			payload[key] = r[key]
+	return payload
+
+
+def attach_meta(records: List[Dict[str, Any]], entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+	"""Copy file/chunk/hash from manifest entries onto the embedder's records (same order)."""
+	for r, entry in zip(records, entries):
+		r["file"], r["chunk"], r["hash"] = entry["file"], entry["chunk"], entry["hash"]
+	return records
+
+
+def qdrant_set_locations(dedup: Optional["ChunkDeduper"]) -> None:
+	"""
+	Record every location of a deduplicated chunk on its shared point (payload
+	`locations`, overwritten each run) and clear it from points that no longer
+	have duplicates, so reconcile-skipped points do not keep stale locations.
+	All writes go out as batch_update_points requests; nothing to do with EMBED_DEDUP=off.
+	"""
+	if dedup is None:
+		return
+	client, qm, collection = _qdrant()
+	try:
+		client.get_collection(collection_name=collection)
+	except Exception:
+		return
+	must_not: List[Any] = [qm.IsEmptyCondition(is_empty=qm.PayloadField(key="locations"))]
+	if dedup.dups:
+		must_not.append(qm.HasIdCondition(has_id=[_to_uuid(rep) for rep in dedup.dups]))
+	ops: List[Any] = [
+		qm.DeletePayloadOperation(delete_payload=qm.DeletePayload(keys=["locations"], filter=qm.Filter(must_not=must_not)))
+	]
+	ops += [
+		qm.SetPayloadOperation(set_payload=qm.SetPayload(payload={"locations": dedup.locations(rep)}, points=[_to_uuid(rep)]))
+		for rep in dedup.dups
 	]
-	client.upsert(collection_name=collection, points=points)
-	print(f"[OK] Upserted {len(points)} vectors to Qdrant::{collection} ({'created' if created else 'existing'} collection)")
+	for i in range(0, len(ops), 1000):
+		client.batch_update_points(collection_name=collection, update_operations=ops[i : i + 1000], wait=False)
+	if dedup.dups:
+		print(f"[OK] Set locations on {len(dedup.dups)} shared points in Qdrant::{collection}")
 
 
-# ---------- main ----------
-def main() -> int:
-	files = iter_files()
+def reconcile_enabled() -> bool:
+	"""EMBED_QDRANT_SYNC=reconcile: only write changed points and delete orphans."""
+	return qdrant_upsert_enabled() and os.getenv("EMBED_QDRANT_SYNC", "upsert") == "reconcile"
+
+
+def qdrant_snapshot() -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+	"""Return {point_id: (payload hash, payload model)} for every point in the collection (no vectors, via scroll)."""
+	client, qm, collection = _qdrant()
+	try:
+		client.get_collection(collection_name=collection)
+	except Exception:
+		return {}
+	existing: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+	offset = None
+	with METRICS.stage("qdrant_scan") as st:
+		while True:
+			points, offset = client.scroll(
+				collection_name=collection,
+				limit=1024,
+				offset=offset,
+				with_payload=["hash", "model"],
+				with_vectors=False,
+			)
+			for pt in points:
+				payload = pt.payload or {}
+				existing[str(pt.id)] = (payload.get("hash"), payload.get("model"))
+			st.add(items=len(points))
+			if offset is None:
+				return existing
+
+
+def qdrant_delete_orphans(existing: Dict[str, Tuple[Optional[str], Optional[str]]], keep: set) -> None:
+	"""Delete points that were in the collection before this run but are no longer produced."""
+	client, qm, collection = _qdrant()
+	orphans = [pid for pid in existing if pid not in keep]
+	with METRICS.stage("qdrant_delete") as st:
+		for i in range(0, len(orphans), 1000):
+			client.delete(
+				collection_name=collection,
+				points_selector=qm.PointIdsList(points=orphans[i : i + 1000]),
+				wait=True,
+			)
+		st.add(items=len(orphans))
+	print(f"[OK] Deleted {len(orphans)} orphaned points from Qdrant::{collection}")
+
+
+def qdrant_release_shared(files: List[str]) -> int:
+	"""
+	Before `files` are re-embedded without dedup and pruned (watch mode), detach them from
+	shared points: a point that stands in for duplicates elsewhere is copied to its first
+	surviving location, and locations in `files` are dropped from the rest. Returns how
+	many shared points were moved.
+	"""
 	if not files:
-		print("[WARN] No files found under docs/context/")
 		return 0
+	client, qm, collection = _qdrant()
+	try:
+		client.get_collection(collection_name=collection)
+	except Exception:
+		return 0
+	gone = set(files)
+	ops: List[Any] = []
+	moved = 0
+	for i in range(0, len(files), 256):
+		flt = qm.Filter(must=[qm.FieldCondition(key="locations[].file", match=qm.MatchAny(any=files[i : i + 256]))])
+		offset = None
+		while True:
+			points, offset = client.scroll(
+				collection_name=collection,
+				scroll_filter=flt,
+				with_payload=True,
+				with_vectors=True,
+				limit=256,
+				offset=offset,
+			)
+			for pt in points:
+				payload = dict(pt.payload or {})
+				survivors = [loc for loc in payload.get("locations") or [] if loc.get("file") not in gone]
+				if payload.get("file") in gone:
+					if not survivors:
+						continue  # no other copy left: re-embedded or pruned with its file
+					rep = sha1(f"{survivors[0]['file']}::{survivors[0]['chunk']}")
+					payload.update(source_id=rep, file=survivors[0]["file"], chunk=survivors[0]["chunk"])
+					payload.pop("locations", None)
+					if len(survivors) > 1:
+						payload["locations"] = survivors
+					ops.append(qm.UpsertOperation(upsert=qm.PointsList(points=[qm.PointStruct(id=_to_uuid(rep), vector=pt.vector, payload=payload)])))
+					moved += 1
+				elif len(survivors) > 1:
+					ops.append(qm.SetPayloadOperation(set_payload=qm.SetPayload(payload={"locations": survivors}, points=[pt.id])))
+				else:
+					ops.append(qm.DeletePayloadOperation(delete_payload=qm.DeletePayload(keys=["locations"], points=[pt.id])))
+			if offset is None:
+				break
+	if ops:
+		# Applied before the re-embedded chunks overwrite (or the prune deletes) the old points
+		client.batch_update_points(collection_name=collection, update_operations=ops, wait=True)
+	return moved
 
-	chunk_records: List[Tuple[str, str]] = []
-	manifest: List[Dict[str, Any]] = []
 
-	for p in files:
-		text = load_text(p)
-		if not text.strip():
-			continue
-		chunks = chunk_text(text)
-		for i, ch in enumerate(chunks):
-			doc_id = sha1(f"{p.as_posix()}::{i}")
-			chunk_records.append((doc_id, ch))
-			manifest.append({"file": p.as_posix(), "chunk": i, "id": doc_id, "len": len(ch)})
+def qdrant_prune_files(files: List[str], keep: set) -> None:
+	"""Delete points whose payload `file` is one of `files`, except ids in `keep` (stale chunks of edited/deleted files)."""
+	if not files:
+		return
+	client, qm, collection = _qdrant()
+	try:
+		client.get_collection(collection_name=collection)
+	except Exception:
+		return
+	must_not = [qm.HasIdCondition(has_id=sorted(keep))] if keep else None
+	with METRICS.stage("qdrant_delete") as st:
+		for i in range(0, len(files), 256):
+			client.delete(
+				collection_name=collection,
+				points_selector=qm.FilterSelector(
+					filter=qm.Filter(
+						must=[qm.FieldCondition(key="file", match=qm.MatchAny(any=files[i : i + 256]))],
+						must_not=must_not,
+					)
+				),
+				wait=True,
+			)
+		st.add(items=len(files))
 
-	# Always write chunk manifest
-	write_manifest(manifest, "chunks.manifest.json")
 
-	# Decide mode
+def maybe_qdrant_upsert(records: List[Dict[str, Any]], existing: Optional[Dict[str, Tuple[Optional[str], Optional[str]]]] = None) -> None:
+	"""
+	Optional Qdrant upsert (requires qdrant-client).
+	Controlled by env: EMBED_QDRANT_UPSERT=1  (back-compat: QDRANT_UPSERT=1)
+	Honors: QDRANT_URL (preferred, e.g. http://localhost:6333), QDRANT_COLLECTION,
+	        QDRANT_PREFER_GRPC=1 / QDRANT_GRPC_PORT, QDRANT_UPSERT_BATCH (256),
+	        QDRANT_UPSERT_WORKERS (4), QDRANT_UPSERT_WAIT=1 (block per batch instead
+	        of one final wait=true batch), QDRANT_UPSERT_TIMEOUT (request timeout, seconds, 120)
+	If `existing` ({point_id: (hash, model)}, see qdrant_snapshot) is given, points
+	whose stored hash and model key both match are skipped.
+	"""
+	if not qdrant_upsert_enabled():
+		print("[INFO] Skipping Qdrant upsert (EMBED_QDRANT_UPSERT!=1)")
+		return
+
+	if not records:
+		print("[INFO] No embeddings to upsert")
+		return
+
+	client, qm, collection = _qdrant()
+	created = _ensure_collection(client, qm, collection, len(records[0]["embedding"]))
+
+	if existing is not None:
+		total = len(records)
+		# Same text embedded by a different model (or EMBED_DIM) is a change too
+		records = [r for r in records if existing.get(_to_uuid(r["id"])) != (r.get("hash"), r.get("model"))]
+		print(f"[INFO] Qdrant::{collection} reconcile: {total - len(records)} unchanged, {len(records)} new/changed")
+		if not records:
+			return
+
+	batch_size = max(1, int(os.getenv("QDRANT_UPSERT_BATCH", "256")))
+	workers = max(1, int(os.getenv("QDRANT_UPSERT_WORKERS", "4")))
+	wait = os.getenv("QDRANT_UPSERT_WAIT", "0") == "1"
+	if _QDRANT["transport"] == "local":
+		# Embedded mode applies every upsert synchronously and is not thread-safe
+		workers, wait = 1, True
+
+	def _send(batch: List[Dict[str, Any]], wait: bool = wait) -> None:
+		points = [
+			qm.PointStruct(
+				id=_to_uuid(r["id"]),
+				vector=r["embedding"],
+				payload=point_payload(r),
+			)
+			for r in batch
+		]
+		call_with_retries(lambda: client.upsert(collection_name=collection, points=points, wait=wait), retries=3)
+
+	t0 = time.perf_counter()
+	batches = [records[i : i + batch_size] for i in range(0, len(records), batch_size)]
+	with METRICS.stage("upsert") as st:
+		with ThreadPoolExecutor(max_workers=workers) as pool:
+			list(pool.map(_send, batches))
+		if not wait:
+			# Updates are applied in the order they were accepted, so once this re-send of the
+			# last batch is applied (wait=true) every earlier batch is too. Checking that ids
+			# exist is not enough: on a re-run (and for changed points) they already do.
+			_send(batches[-1], wait=True)
+		st.add(items=len(records), nbytes=sum(4 * len(r["embedding"]) for r in records))
+	dt = max(time.perf_counter() - t0, 1e-9)
+	print(
+		f"[OK] Upserted {len(records)} vectors to Qdrant::{collection} ({created} collection) "
+		f"in {dt:.2f}s ({len(records) / dt:.0f} pts/s; {len(batches)} batches x <= {batch_size}, "
+		f"workers={workers}, {_QDRANT['transport']})"
+	)
+
+
+# ---------- main ----------
+EMBEDDERS: Dict[str, Callable[[List[Tuple[str, str]]], List[Dict[str, Any]]]] = {
+	"openai": try_openai_embed,
+	"local": try_local_embed,
+	"fake": try_fake_embed,
+}
+
+
+def resolve_mode() -> str:
 	mode = os.getenv("EMBED_MODE")
 	if not mode:
 		mode = "openai" if os.getenv("OPENAI_API_KEY") else "dry"
+	return mode
+
+
+def embed_texts(texts: List[str], mode: Optional[str] = None) -> List[List[float]]:
+	"""Embed ad-hoc texts (e.g. search queries) with the same backend/model as the corpus."""
+	mode = mode or resolve_mode()
+	if mode not in EMBEDDERS:
+		raise RuntimeError(f"EMBED_MODE={mode} cannot embed queries; use: {' | '.join(EMBEDDERS)}")
+	return [r["embedding"] for r in EMBEDDERS[mode]([(sha1(t), t) for t in texts])]
+
+
+def metered_chunks(files: Iterable[pathlib.Path]) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+	"""iter_chunks with the file walk (files, bytes on disk) and load+chunk time recorded as separate stages."""
+	walk = METRICS.iter("walk", files, nbytes=lambda p: p.stat().st_size)
+	return METRICS.iter("chunk", iter_chunks(walk))
+
+
+def metered_embed(mode: str, chunks: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+	nbytes = sum(len(ch.encode("utf-8")) for _, ch in chunks)
+	with METRICS.stage("embed") as st:
+		records = EMBEDDERS[mode](chunks)
+		st.add(items=len(records), nbytes=nbytes)
+	model = embed_model_key(mode)
+	for r in records:
+		r["model"] = model
+	return records
+
+
+def checkpointed_embed(
+	mode: str,
+	chunks: List[Tuple[str, str]],
+	entries: List[Dict[str, Any]],
+	ckpt: Optional[EmbedCheckpoint],
+) -> List[Dict[str, Any]]:
+	"""
+	Embed chunks (with manifest metadata attached). Chunks already in the checkpoint
+	are reused; the rest are embedded in checkpoint-sized batches, each made durable
+	before the next starts, so an interrupted run loses at most one batch.
+	"""
+	if ckpt is None:
+		return attach_meta(metered_embed(mode, chunks), entries)
+	out: List[Dict[str, Any]] = []
+	todo: List[int] = []
+	model = embed_model_key(mode)  # the checkpoint only holds vectors of this model
+	for i, ((doc_id, ch), entry) in enumerate(zip(chunks, entries)):
+		vec = ckpt.get(doc_id, entry["hash"])
+		if vec is None:
+			todo.append(i)
+		out.append({"id": doc_id, "embedding": vec, "len": len(ch), "model": model})
+	for idx in batched(todo, ckpt.batch_size):
+		records = attach_meta(metered_embed(mode, [chunks[i] for i in idx]), [entries[i] for i in idx])
+		ckpt.append(records)
+		for i, r in zip(idx, records):
+			out[i] = r
+	return attach_meta(out, entries)
+
+
+def finish_checkpoint(ckpt: Optional[EmbedCheckpoint]) -> None:
+	"""Called only once vectors are written and upserted: the checkpoint is no longer needed."""
+	if ckpt is None:
+		return
+	if ckpt.resumed:
+		print(f"[OK] checkpoint: resumed {ckpt.resumed} chunks without re-embedding, embedded {ckpt.appended}")
+	METRICS.inc("checkpoint_resumed", ckpt.resumed)
+	ckpt.clear()
+
+
+def run_batch(mode: str) -> int:
+	"""Classic mode: build the whole chunk list, embed it, then write and upsert."""
+	with METRICS.stage("walk") as st:
+		files = list(iter_files())
+		st.add(items=len(files), nbytes=sum(p.stat().st_size for p in files))
+	if not files:
+		print("[WARN] No files found under docs/context/")
+		return 0
+
+	dedup = ChunkDeduper.from_env()
+	chunk_records: List[Tuple[str, str]] = []
+	unique_entries: List[Dict[str, Any]] = []
+	manifest: List[Dict[str, Any]] = []
+	for doc_id, ch, entry in METRICS.iter("chunk", iter_chunks(files)):
+		manifest.append(entry)
+		# Duplicates stay in the manifest (mapped to the representative id) but are not embedded
+		if dedup is not None:
+			with METRICS.stage("dedup") as st:
+				dup = dedup.check(entry, ch)
+				st.add(items=1)
+			if dup:
+				continue
+		chunk_records.append((doc_id, ch))
+		unique_entries.append(entry)
+
+	# Always write chunk manifest
+	with METRICS.stage("write") as st:
+		write_manifest(manifest, "chunks.manifest.json")
+		st.add(items=len(manifest))
+	if dedup is not None:
+		dedup.report()
 
 	if mode == "dry":
 		print("[INFO] DRY RUN: wrote chunk manifest only (set OPENAI_API_KEY or EMBED_MODE=local to embed)")
 		return 0
 
-	if mode == "openai":
-		vecs = try_openai_embed(chunk_records)
-	elif mode == "local":
-		vecs = try_local_embed(chunk_records)
-	else:
-		print(f"[ERR] Unknown EMBED_MODE={mode}; use: openai | local | dry")
-		return 2
+	ckpt = EmbedCheckpoint.from_env(mode)
+	try:
+		vecs = checkpointed_embed(mode, chunk_records, unique_entries, ckpt)
+		with METRICS.stage("write") as st:
+			write_vectors(vecs)
+			st.add(items=len(vecs), nbytes=sum(4 * len(r["embedding"]) for r in vecs))
+		if reconcile_enabled():
+			existing = qdrant_snapshot()
+			maybe_qdrant_upsert(vecs, existing=existing)
+			qdrant_delete_orphans(existing, {_to_uuid(r["id"]) for r in vecs})
+		else:
+			maybe_qdrant_upsert(vecs)
+		if qdrant_upsert_enabled():
+			qdrant_set_locations(dedup)
+	finally:
+		if ckpt is not None:
+			ckpt.close()
+	finish_checkpoint(ckpt)
+	return 0
 
-	write_manifest(vecs, "chunks.embeddings.json")
-	maybe_qdrant_upsert(vecs)
+
+def run_streaming(mode: str, batch_size: int) -> int:
+	"""
+	Streaming mode: iter_files -> load_text -> chunk_text -> embed -> write/upsert
+	over fixed-size batches, so peak memory tracks batch_size instead of corpus size.
+	"""
+	manifest_out = JsonArrayWriter("chunks.manifest.json")
+	vecs_out = VectorArtifactWriter() if mode != "dry" else None
+	json_out = JsonArrayWriter("chunks.embeddings.json") if vecs_out and os.getenv("EMBED_JSON", "0") == "1" else None
+	upsert = qdrant_upsert_enabled() and mode != "dry"
+	# Reconcile keeps only point ids + hashes in memory, never vectors
+	existing = qdrant_snapshot() if upsert and reconcile_enabled() else None
+	keep: set = set()
+	dedup = ChunkDeduper.from_env()
+	ckpt = EmbedCheckpoint.from_env(mode)
+	batches = 0
+	try:
+		for batch in batched(metered_chunks(iter_files()), batch_size):
+			batches += 1
+			if dedup is not None:
+				# Representatives are the first occurrence, so later duplicates always find one
+				with METRICS.stage("dedup") as st:
+					dup_flags = [dedup.check(entry, ch) for _, ch, entry in batch]
+					st.add(items=len(batch))
+				with METRICS.stage("write"):
+					manifest_out.write(entry for _, _, entry in batch)
+				batch = [item for item, dup in zip(batch, dup_flags) if not dup]
+			else:
+				with METRICS.stage("write"):
+					manifest_out.write(entry for _, _, entry in batch)
+			if vecs_out is None or not batch:
+				continue
+			vecs = checkpointed_embed(
+				mode,
+				[(doc_id, ch) for doc_id, ch, _ in batch],
+				[entry for _, _, entry in batch],
+				ckpt,
+			)
+			with METRICS.stage("write") as st:
+				vecs_out.write(vecs)
+				if json_out is not None:
+					json_out.write(vecs)
+				st.add(items=len(vecs), nbytes=sum(4 * len(r["embedding"]) for r in vecs))
+			if upsert:
+				maybe_qdrant_upsert(vecs, existing=existing)
+				keep.update(_to_uuid(r["id"]) for r in vecs)
+	finally:
+		manifest_out.close()
+		if vecs_out is not None:
+			vecs_out.close()
+		if json_out is not None:
+			json_out.close()
+		if ckpt is not None:
+			ckpt.close()
+
+	if dedup is not None:
+		dedup.report()
+	if existing is not None:
+		qdrant_delete_orphans(existing, keep)
+	if upsert:
+		qdrant_set_locations(dedup)
+	if not manifest_out.count:
+		print("[WARN] No files found under docs/context/")
+	if vecs_out is None:
+		print("[INFO] DRY RUN: wrote chunk manifest only (set OPENAI_API_KEY or EMBED_MODE=local to embed)")
+	elif not upsert:
+		print("[INFO] Skipping Qdrant upsert (EMBED_QDRANT_UPSERT!=1)")
+	print(f"[OK] streamed {manifest_out.count} chunks in {batches} batches of <= {batch_size}")
+	finish_checkpoint(ckpt)
 	return 0
 
 
+def embed_paths(mode: str, paths: Iterable[pathlib.Path]) -> Dict[str, int]:
+	"""
+	Incremental update for just these docs/context/ files (watch mode): re-chunk and
+	re-embed the ones that exist, upsert them, and delete every other point of the
+	same files (dropped trailing chunks, deleted files). Unchanged chunks are served
+	by the embed cache. No dedup: shared points that also stand for chunks in other
+	files are moved there first (qdrant_release_shared), and the local artifacts
+	(manifest, .npy) are left to the next full run. Skips embedding unless mode can
+	embed and EMBED_QDRANT_UPSERT=1.
+	"""
+	paths = sorted(set(paths))
+	live = [p for p in paths if p.suffix.lower() in TEXT_EXTS and p.is_file()]
+	triples = list(metered_chunks(live))
+	counts = {"files": len(live), "removed": len(paths) - len(live), "chunks": len(triples), "upserted": 0, "moved": 0}
+	if mode not in EMBEDDERS or not qdrant_upsert_enabled():
+		return counts
+	counts["moved"] = qdrant_release_shared([p.as_posix() for p in paths])
+	vecs = attach_meta(metered_embed(mode, [(doc_id, ch) for doc_id, ch, _ in triples]), [e for _, _, e in triples]) if triples else []
+	if vecs:
+		maybe_qdrant_upsert(vecs)
+	qdrant_prune_files([p.as_posix() for p in paths], {_to_uuid(r["id"]) for r in vecs})
+	counts["upserted"] = len(vecs)
+	return counts
+
+
+def main() -> int:
+	mode = resolve_mode()
+	if mode != "dry" and mode not in EMBEDDERS:
+		print(f"[ERR] Unknown EMBED_MODE={mode}; use: openai | local | fake | dry")
+		return 2
+
+	stream = os.getenv("EMBED_STREAM", "0") == "1"
+	METRICS.labels.update(mode=mode, pipeline="stream" if stream else "batch")
+	try:
+		# EMBED_STREAM=1 bounds memory by EMBED_STREAM_BATCH chunks instead of the whole corpus
+		if stream:
+			rc = run_streaming(mode, int(os.getenv("EMBED_STREAM_BATCH", "256")))
+		else:
+			rc = run_batch(mode)
+		report_cache_stats()
+		return rc
+	finally:
+		# Written on failure too, so a slow or broken nightly run still shows where the time went
+		METRICS.finish()
+
+
 if __name__ == "__main__":
 	sys.exit(main())
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# --- Amara Script Metadata ---
+# Repo: amara-core
+# Role: Incremental BM25 index over docs/context/ chunks, plus hybrid (lexical + vector) queries
+# Owner: core
+# Secrets: reads $OPENAI_API_KEY only for --hybrid queries in openai mode
+# Notes: Stdlib sqlite3 inverted index at artifacts/lexical.sqlite3; same chunks/ids as embed.py
+# --------------------------------
+"""
+lexical_index.py
+
+Exact-identifier lookups (Makefile targets, env vars like EMBED_QDRANT_UPSERT,
+file paths) are served from an on-disk BM25 index instead of the embedding API.
+
+  python scripts/lexical_index.py update                  # incremental: only changed files are re-indexed
+  python scripts/lexical_index.py query EMBED_QDRANT_UPSERT
+  python scripts/lexical_index.py query --hybrid "how do I reset the qdrant collection"
+
+Chunks and ids come from embed.py (iter_files / chunk_text / sha1(path::i)), so
+lexical hits line up with vector hits for reciprocal-rank fusion (--hybrid);
+deduplicated chunks are fused under their representative id (chunks.manifest.json).
+"""
+
+import re
+import sys
+import json
+import math
+import time
+import sqlite3
+import argparse
+import importlib
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import embed
+
+INDEX_NAME = "lexical.sqlite3"
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60
+
+# Identifier-ish tokens: keep EMBED_QDRANT_UPSERT / scripts/embed.py whole, and
+# also index their parts so "qdrant upsert" still matches.
+TOKEN_RE = re.compile(r"[A-Za-z0-9_][A-Za-z0-9_./-]*[A-Za-z0-9_]|[A-Za-z0-9_]")
+SPLIT_RE = re.compile(r"[_./-]+")
+
+
+def tokenize(text: str) -> Iterator[str]:
+	for m in TOKEN_RE.finditer(text):
+		tok = m.group(0).lower()
+		yield tok
+		if SPLIT_RE.search(tok):
+			for part in SPLIT_RE.split(tok):
+				if part:
+					yield part
+
+
+class LexicalIndex:
+	"""BM25 inverted index stored in sqlite; files are re-indexed only when size/mtime change."""
+
+	def __init__(self, path: Optional[Path] = None) -> None:
+		self.path = path or embed.OUT / INDEX_NAME
+		self._db = sqlite3.connect(str(self.path))
+		self._db.executescript(
+			"""
+			PRAGMA journal_mode=WAL;
+			CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL);
+			CREATE TABLE IF NOT EXISTS docs (id TEXT PRIMARY KEY, file TEXT NOT NULL, chunk INTEGER NOT NULL, len INTEGER NOT NULL);
+			CREATE INDEX IF NOT EXISTS docs_file ON docs(file);
+			CREATE TABLE IF NOT EXISTS postings (term TEXT NOT NULL, doc_id TEXT NOT NULL, tf INTEGER NOT NULL,
+				PRIMARY KEY (term, doc_id)) WITHOUT ROWID;
+			CREATE INDEX IF NOT EXISTS postings_doc ON postings(doc_id);
+			CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL NOT NULL);
+			"""
+		)
+		self._stats: Optional[Tuple[int, float]] = None
+
+	def close(self) -> None:
+		self._db.close()
+
+	# ---------- writes ----------
+	def _remove_file(self, file: str) -> None:
+		self._db.execute("DELETE FROM postings WHERE doc_id IN (SELECT id FROM docs WHERE file=?)", (file,))
+		self._db.execute("DELETE FROM docs WHERE file=?", (file,))
+		self._db.execute("DELETE FROM files WHERE path=?", (file,))
+
+	def _add_file(self, p: Path) -> int:
+		st = p.stat()
+		file = p.as_posix()
+		text = embed.load_text(p)
+		n = 0
+		if text.strip():
+			for i, ch in enumerate(embed.chunk_text(text)):
+				doc_id = embed.sha1(f"{file}::{i}")
+				tf = Counter(tokenize(ch))
+				self._db.execute("INSERT OR REPLACE INTO docs VALUES (?, ?, ?, ?)", (doc_id, file, i, sum(tf.values())))
+				self._db.executemany("INSERT OR REPLACE INTO postings VALUES (?, ?, ?)", [(t, doc_id, c) for t, c in tf.items()])
+				n += 1
+		self._db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?)", (file, st.st_size, st.st_mtime_ns))
+		return n
+
+	def _refresh_stats(self) -> None:
+		n, avgdl = self._db.execute("SELECT COUNT(*), COALESCE(AVG(len), 0) FROM docs").fetchone()
+		self._db.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [("n_docs", n), ("avgdl", avgdl)])
+		self._stats = None
+
+	def update(self, files: Optional[Iterable[Path]] = None) -> Dict[str, int]:
+		"""Sync the index with docs/context/: (re)index new/changed files, drop deleted ones."""
+		known = {row[0]: (row[1], row[2]) for row in self._db.execute("SELECT path, size, mtime_ns FROM files")}
+		seen: set = set()
+		counts = {"indexed": 0, "unchanged": 0, "removed": 0, "chunks": 0}
+		with self._db:
+			for p in files if files is not None else embed.iter_files():
+				file = p.as_posix()
+				seen.add(file)
+				st = p.stat()
+				if known.get(file) == (st.st_size, st.st_mtime_ns):
+					counts["unchanged"] += 1
+					continue
+				self._remove_file(file)
+				counts["chunks"] += self._add_file(p)
+				counts["indexed"] += 1
+			for file in set(known) - seen:
+				self._remove_file(file)
+				counts["removed"] += 1
+			self._refresh_stats()
+		return counts
+
+	def update_paths(self, paths: Iterable[Path]) -> Dict[str, int]:
+		"""Re-index (or drop, if gone) just these files; used by watch mode."""
+		counts = {"indexed": 0, "removed": 0, "chunks": 0}
+		with self._db:
+			for p in paths:
+				self._remove_file(p.as_posix())
+				if p.is_file():
+					counts["chunks"] += self._add_file(p)
+					counts["indexed"] += 1
+				else:
+					counts["removed"] += 1
+			self._refresh_stats()
+		return counts
+
+	# ---------- reads ----------
+	def _corpus_stats(self) -> Tuple[int, float]:
+		if self._stats is None:
+			meta = dict(self._db.execute("SELECT key, value FROM meta").fetchall())
+			self._stats = (int(meta.get("n_docs", 0)), float(meta.get("avgdl", 0.0)) or 1.0)
+		return self._stats
+
+	def search(self, query: str, k: int = 10) -> List[Tuple[float, str]]:
+		"""Top-k (bm25_score, doc_id) for the query terms."""
+		n_docs, avgdl = self._corpus_stats()
+		scores: Dict[str, float] = {}
+		for term, qtf in Counter(tokenize(query)).items():
+			rows = self._db.execute(
+				"SELECT p.doc_id, p.tf, d.len FROM postings p JOIN docs d ON d.id = p.doc_id WHERE p.term=?",
+				(term,),
+			).fetchall()
+			if not rows:
+				continue
+			idf = math.log(1 + (n_docs - len(rows) + 0.5) / (len(rows) + 0.5))
+			for doc_id, tf, dl in rows:
+				norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * dl / avgdl)
+				scores[doc_id] = scores.get(doc_id, 0.0) + qtf * idf * tf * (BM25_K1 + 1) / norm
+		return sorted(((s, d) for d, s in scores.items()), reverse=True)[:k]
+
+	def describe(self, doc_id: str) -> Dict[str, Any]:
+		row = self._db.execute("SELECT file, chunk FROM docs WHERE id=?", (doc_id,)).fetchone()
+		return {"id": doc_id, "file": row[0] if row else None, "chunk": row[1] if row else None}
+
+
+def rrf_merge(rankings: List[List[str]], k: int = RRF_K) -> List[Tuple[float, str]]:
+	"""Reciprocal-rank fusion: score(d) = sum over rankings of 1 / (k + rank)."""
+	fused: Dict[str, float] = {}
+	for ranking in rankings:
+		for rank, doc_id in enumerate(ranking, 1):
+			fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+	return sorted(((s, d) for d, s in fused.items()), reverse=True)
+
+
+def dedup_aliases(out_dir: Optional[Path] = None) -> Dict[str, str]:
+	"""
+	{per-location id: representative id} for chunks embed.py deduplicated. Vector hits
+	carry only the representative, so lexical ids are mapped onto it before fusion.
+	"""
+	path = (out_dir or embed.OUT) / "chunks.manifest.json"
+	if not path.exists():
+		return {}
+	aliases: Dict[str, str] = {}
+	for e in json.loads(path.read_text(encoding="utf-8")):
+		loc_id = embed.sha1(f"{e['file']}::{e['chunk']}")
+		if loc_id != e["id"]:
+			aliases[loc_id] = e["id"]
+	return aliases
+
+
+def canonical_ranking(ranking: Iterable[str], aliases: Dict[str, str]) -> List[str]:
+	"""Map ids to their representatives, keeping each one at its best rank."""
+	out: List[str] = []
+	seen: set = set()
+	for doc_id in ranking:
+		doc_id = aliases.get(doc_id, doc_id)
+		if doc_id not in seen:
+			seen.add(doc_id)
+			out.append(doc_id)
+	return out
+
+
+def vector_ranking(queries: List[str], k: int, backend: str) -> List[List[str]]:
+	"""Dense top-k ids per query, from the local artifact (search_local) or from Qdrant."""
+	if backend == "local":
+		search_local = importlib.import_module("search_local")
+		index = search_local.LocalIndex()
+		hits = index.search(embed.embed_texts(queries), k)
+		return [[doc_id for _, doc_id in row] for row in hits]
+
+	client, qm, collection = embed._qdrant()
+	qdrant_init = importlib.import_module("qdrant_init")
+	requests = [
+		qm.QueryRequest(query=v, limit=k, params=qdrant_init.search_params(), with_payload=["source_id"])
+		for v in embed.embed_texts(queries)
+	]
+	responses = client.query_batch_points(collection_name=collection, requests=requests)
+	return [[(pt.payload or {}).get("source_id", str(pt.id)) for pt in resp.points] for resp in responses]
+
+
+def main(argv: List[str]) -> int:
+	parser = argparse.ArgumentParser(description="Incremental BM25 index over docs/context/ with hybrid queries.")
+	sub = parser.add_subparsers(dest="cmd", required=True)
+	sub.add_parser("update", help="Index new/changed files and drop deleted ones")
+	q = sub.add_parser("query", help="Search the index")
+	q.add_argument("queries", nargs="+")
+	q.add_argument("-k", "--top-k", type=int, default=5)
+	q.add_argument("--hybrid", action="store_true", help="Fuse lexical and vector rankings with RRF")
+	q.add_argument("--vector", choices=["local", "qdrant"], default="local", help="Vector source for --hybrid")
+	q.add_argument("--json", action="store_true")
+	args = parser.parse_args(argv)
+
+	index = LexicalIndex()
+	try:
+		if args.cmd == "update":
+			t0 = time.perf_counter()
+			counts = index.update()
+			dt = time.perf_counter() - t0
+			print(
+				f"[OK] lexical index: indexed={counts['indexed']} unchanged={counts['unchanged']} "
+				f"removed={counts['removed']} chunks={counts['chunks']} in {dt:.2f}s ({index.path})"
+			)
+			return 0
+
+		pool = max(args.top_k * 4, 20)  # fuse over a deeper list than we print
+		results: List[Tuple[str, float, List[Tuple[float, str]]]] = []
+		for query in args.queries:
+			t0 = time.perf_counter()
+			hits = index.search(query, pool if args.hybrid else args.top_k)
+			results.append((query, (time.perf_counter() - t0) * 1000, hits))
+
+		if args.hybrid:
+			dense = vector_ranking(args.queries, pool, args.vector)
+			aliases = dedup_aliases()
+			results = [
+				(query, ms, rrf_merge([canonical_ranking((d for _, d in hits), aliases), ranking])[: args.top_k])
+				for (query, ms, hits), ranking in zip(results, dense)
+			]
+
+		if args.json:
+			out = [
+				{"query": query, "lexical_ms": round(ms, 3), "hits": [dict(index.describe(d), score=round(s, 6)) for s, d in hits]}
+				for query, ms, hits in results
+			]
+			print(json.dumps(out, indent=2))
+			return 0
+		for query, ms, hits in results:
+			print(f"# {query}  (lexical {ms:.3f} ms{', rrf' if args.hybrid else ''})")
+			for rank, (score, doc_id) in enumerate(hits, 1):
+				d = index.describe(doc_id)
+				print(f"  {rank:>2}. {score:.4f}  {d['file']}::{d['chunk']}  ({doc_id})")
+		return 0
+	finally:
+		index.close()
+
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,7 @@
+# --- Amara Script Metadata ---
+# Repo: amara-core
+# Role: Shared Python helpers for scripts/ (import as `from lib.<module> import ...`)
+# Owner: core
+# Secrets: none
+# Notes: Regular package so `lib` resolves to scripts/lib ahead of any site-packages namesake
+# --------------------------------
@@ -0,0 +1,265 @@
+# --- Amara Script Metadata ---
+# Repo: amara-core
+# Role: Per-stage run instrumentation (wall time, items, bytes, errors, peak RSS) for embed/sync scripts
+# Owner: core
+# Secrets: none
+# Notes: Writes artifacts/<job>.metrics.json, <job>.metrics.prom (Prometheus text) and appends <job>.metrics.history.jsonl
+# --------------------------------
+"""
+lib.metrics
+
+    from lib.metrics import RunMetrics
+
+    metrics = RunMetrics("embed", mode="openai")
+    with metrics.stage("embed") as st:
+        vecs = embed(chunks)
+        st.add(items=len(vecs), nbytes=sum(len(c) for c in chunks))
+    for p in metrics.iter("walk", iter_files(), nbytes=lambda p: p.stat().st_size):
+        ...
+    metrics.finish()    # prints a summary table and writes the artifacts
+
+Stage time is exclusive: while a nested stage (or a wrapped generator) runs, the
+enclosing stage's clock is paused, so `walk` and `chunk` add up to the wall time
+of the streaming loop instead of double counting it. A stage can be entered any
+number of times; its totals accumulate.
+
+Environment:
+  METRICS=0            → collect but do not write artifacts
+  METRICS_DIR=<path>   → output directory (default: artifacts/)
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import json
+import time
+import socket
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (ru_maxrss is KiB on Linux, bytes on macOS); 0 if unknown."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class Stage:
+    """Accumulated totals for one named stage."""
+
+    __slots__ = ("name", "seconds", "calls", "items", "bytes", "errors", "_lock")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.seconds = 0.0
+        self.calls = 0
+        self.items = 0
+        self.bytes = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def add(self, items: int = 0, nbytes: int = 0, errors: int = 0) -> None:
+        """Thread-safe: worker pools may report into the stage their caller opened."""
+        with self._lock:
+            self.items += items
+            self.bytes += nbytes
+            self.errors += errors
+
+    def to_dict(self) -> Dict[str, Any]:
+        secs = self.seconds
+        return {
+            "seconds": round(secs, 6),
+            "calls": self.calls,
+            "items": self.items,
+            "bytes": self.bytes,
+            "errors": self.errors,
+            "items_per_s": round(self.items / secs, 2) if secs > 0 and self.items else None,
+            "mb_per_s": round(self.bytes / secs / 1e6, 3) if secs > 0 and self.bytes else None,
+        }
+
+
+class RunMetrics:
+    """Per-run collector; `labels` (e.g. mode=openai) are attached to every Prometheus sample."""
+
+    def __init__(self, job: str, **labels: str) -> None:
+        self.job = job
+        self.labels = {k: str(v) for k, v in labels.items()}
+        self.stages: Dict[str, Stage] = {}
+        self.counters: Dict[str, int] = {}
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    # ---------- recording ----------
+    def _stage(self, name: str) -> Stage:
+        with self._lock:
+            st = self.stages.get(name)
+            if st is None:
+                st = self.stages[name] = Stage(name)
+            return st
+
+    def _stack(self) -> List[List[Any]]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _enter(self, st: Stage) -> None:
+        # [stage, start, time spent in nested stages]
+        self._stack().append([st, time.perf_counter(), 0.0])
+
+    def _exit(self) -> None:
+        st, t0, nested = self._stack().pop()
+        total = time.perf_counter() - t0
+        with st._lock:
+            st.seconds += total - nested
+            st.calls += 1
+        stack = self._stack()
+        if stack:
+            stack[-1][2] += total
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Stage]:
+        """Time a block; an exception escaping the block counts as one error and is re-raised."""
+        st = self._stage(name)
+        self._enter(st)
+        try:
+            yield st
+        except BaseException:
+            st.add(errors=1)
+            raise
+        finally:
+            self._exit()
+
+    def iter(
+        self,
+        name: str,
+        items: Iterable[T],
+        *,
+        count: Optional[Callable[[T], int]] = None,
+        nbytes: Optional[Callable[[T], int]] = None,
+    ) -> Iterator[T]:
+        """Wrap a (lazy) iterable: only time spent producing items is charged to `name`."""
+        st = self._stage(name)
+        it = iter(items)
+        while True:
+            self._enter(st)
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            except BaseException:
+                st.add(errors=1)
+                raise
+            finally:
+                self._exit()
+            st.add(items=count(item) if count else 1, nbytes=nbytes(item) if nbytes else 0)
+            yield item
+
+    def inc(self, name: str, n: int = 1) -> None:
+        """Free-form run counter (e.g. retries, cache hits)."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    # ---------- output ----------
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job": self.job,
+            "labels": self.labels,
+            "host": socket.gethostname(),
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(self.started)),
+            "wall_seconds": round(time.perf_counter() - self._t0, 6),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "stages": {name: st.to_dict() for name, st in self.stages.items()},
+            "counters": dict(self.counters),
+        }
+
+    def to_prometheus(self) -> str:
+        """
+        Prometheus text exposition format (node_exporter textfile collector compatible).
+        Every value is this run's total and starts from zero on the next run, so all of
+        them are gauges (as counters, each run would read as a counter reset).
+        """
+        data = self.to_dict()
+        base = dict(self.labels, job=self.job)
+
+        def fmt(extra: Optional[Dict[str, str]] = None) -> str:
+            labels = dict(base, **(extra or {}))
+            body = ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items()))
+            return "{" + body + "}"
+
+        lines: List[str] = []
+
+        def metric(name: str, kind: str, help_: str, samples: List[tuple]) -> None:
+            lines.append(f"# HELP amara_{name} {help_}")
+            lines.append(f"# TYPE amara_{name} {kind}")
+            for extra, value in samples:
+                lines.append(f"amara_{name}{fmt(extra)} {value}")
+
+        stages = data["stages"]
+        metric("run_start_timestamp_seconds", "gauge", "Unix time the run started.", [(None, round(self.started, 3))])
+        metric("run_wall_seconds", "gauge", "Wall time of the whole run.", [(None, data["wall_seconds"])])
+        metric("run_peak_rss_bytes", "gauge", "Peak resident set size of the process.", [(None, int(data["peak_rss_mb"] * 1024 * 1024))])
+        for key, help_ in (
+            ("seconds", "Exclusive wall time spent in the stage."),
+            ("items", "Items processed by the stage."),
+            ("bytes", "Bytes processed by the stage."),
+            ("errors", "Errors raised in the stage."),
+            ("calls", "Times the stage was entered."),
+        ):
+            metric(f"stage_{key}", "gauge", help_, [({"stage": n}, s[key]) for n, s in stages.items()])
+        if self.counters:
+            metric("run_events", "gauge", "Free-form run counters.", [({"event": k}, v) for k, v in self.counters.items()])
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        data = self.to_dict()
+        rows = [f"[metrics] {self.job}: wall={data['wall_seconds']:.2f}s peak_rss={data['peak_rss_mb']:.1f}MB"]
+        for name, s in data["stages"].items():
+            rate = f"{s['items_per_s']:.1f}/s" if s["items_per_s"] else "-"
+            err = f" errors={s['errors']}" if s["errors"] else ""
+            rows.append(f"  {name:<14} {s['seconds']:>9.3f}s  items={s['items']:<8} bytes={s['bytes']:<11} {rate}{err}")
+        if self.counters:
+            rows.append("  " + " ".join(f"{k}={v}" for k, v in sorted(self.counters.items())))
+        return "\n".join(rows)
+
+    def write(self, out_dir: Optional[Path] = None) -> Optional[Path]:
+        """Write <job>.metrics.json / .prom and append a history line; returns the JSON path."""
+        if os.getenv("METRICS", "1") == "0":
+            return None
+        out_dir = Path(out_dir or os.getenv("METRICS_DIR") or ROOT / "artifacts")
+        out_dir.mkdir(parents=True, exist_ok=True)
+        data = self.to_dict()
+        out = out_dir / f"{self.job}.metrics.json"
+        out.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        # Write-then-rename so a textfile collector never scrapes a half-written file
+        prom = out_dir / f"{self.job}.metrics.prom"
+        tmp = prom.with_suffix(".prom.tmp")
+        tmp.write_text(self.to_prometheus(), encoding="utf-8")
+        os.replace(tmp, prom)
+        with (out_dir / f"{self.job}.metrics.history.jsonl").open("a", encoding="utf-8") as fh:
+            fh.write(json.dumps(data, separators=(",", ":")) + "\n")
+        return out
+
+    def finish(self, out_dir: Optional[Path] = None) -> None:
+        """Print the summary table (lands in tee'd logs) and write the artifacts."""
+        print(self.summary())
+        out = self.write(out_dir)
+        if out is not None:
+            print(f"[OK] wrote {out} (+ .prom)")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
@@ -5,6 +5,7 @@
 # Owner: core
 # Secrets: none (reads env only)
 # Notes: Run before first embed; idempotent. Prints actual dim/distance from server.
+#        Optional scalar/binary quantization (QDRANT_QUANTIZATION); embed.py reuses collection_kwargs_from_env().
 # --------------------------------
 import os
 import sys
@@ -12,7 +13,21 @@ import argparse
 from typing import Tuple, Any
 
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams, HnswConfigDiff
+from qdrant_client.http.models import (
+	BinaryQuantization,
+	BinaryQuantizationConfig,
+	Disabled,
+	Distance,
+	HnswConfigDiff,
+	QuantizationSearchParams,
+	ScalarQuantization,
+	ScalarQuantizationConfig,
+	ScalarType,
+	SearchParams,
+	VectorParams,
+)
+
+QUANTIZATION_KINDS = ("none", "scalar", "binary")
 
 
 def env(name: str, default: str | None = None) -> str | None:
@@ -55,20 +70,120 @@ def _extract_dim_distance(info: Any) -> Tuple[str, str]:
 	return (str(size) if size is not None else "unknown", str(dist) if dist is not None else "unknown")
 
 
+def quantization_config(kind: str, always_ram: bool = True) -> Any:
+	"""
+	Quantized copy of the vectors used for search; the float32 originals stay on disk
+	for rescoring. scalar = int8 (4x smaller), binary = 1 bit/dim (32x smaller,
+	best with high-dim OpenAI vectors and oversampling).
+	"""
+	if kind == "scalar":
+		return ScalarQuantization(
+			scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=always_ram)
+		)
+	if kind == "binary":
+		return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=always_ram))
+	if kind == "none":
+		return None
+	raise ValueError(f"unknown quantization: {kind} (use: {' | '.join(QUANTIZATION_KINDS)})")
+
+
+def collection_kwargs(
+	dim: int,
+	distance: Distance,
+	*,
+	quantization: str = "none",
+	always_ram: bool = True,
+	hnsw_m: int = 16,
+	hnsw_ef_construct: int = 128,
+) -> dict:
+	"""create_collection() kwargs shared by this script and embed.py."""
+	kwargs = {
+		"vectors_config": VectorParams(size=dim, distance=distance, on_disk=True),
+		"hnsw_config": HnswConfigDiff(m=hnsw_m, ef_construct=hnsw_ef_construct),
+	}
+	qcfg = quantization_config(quantization, always_ram)
+	if qcfg is not None:
+		kwargs["quantization_config"] = qcfg
+	return kwargs
+
+
+def collection_kwargs_from_env(dim: int, distance: Distance = Distance.COSINE) -> dict:
+	"""Same as collection_kwargs(), configured from QDRANT_QUANTIZATION / QDRANT_HNSW_* env."""
+	return collection_kwargs(
+		dim,
+		distance,
+		quantization=env("QDRANT_QUANTIZATION", "none") or "none",
+		always_ram=env("QDRANT_QUANTIZATION_ALWAYS_RAM", "1") != "0",
+		hnsw_m=int(env("QDRANT_HNSW_M", "16") or "16"),
+		hnsw_ef_construct=int(env("QDRANT_HNSW_EF_CONSTRUCT", "128") or "128"),
+	)
+
+
+def search_params() -> SearchParams | None:
+	"""
+	Query-time params for quantized collections: search the in-RAM quantized vectors,
+	then rescore the top oversampling*limit candidates with the on-disk originals.
+	Env: QDRANT_QUANTIZATION, QDRANT_RESCORE (default 1), QDRANT_OVERSAMPLING (default 2.0).
+	"""
+	if (env("QDRANT_QUANTIZATION", "none") or "none") == "none":
+		return None
+	return SearchParams(
+		quantization=QuantizationSearchParams(
+			ignore=False,
+			rescore=env("QDRANT_RESCORE", "1") != "0",
+			oversampling=float(env("QDRANT_OVERSAMPLING", "2.0") or "2.0"),
+		)
+	)
+
+
+def _extract_quantization(info: Any) -> Tuple[str, bool | None]:
+	"""Return (kind, always_ram) of the collection's quantization config."""
+	qcfg = getattr(getattr(info, "config", None), "quantization_config", None)
+	if qcfg is None:
+		return "none", None
+	for kind in ("scalar", "binary", "product"):
+		inner = getattr(qcfg, kind, None)
+		if inner is not None:
+			return kind, getattr(inner, "always_ram", None)
+	return "unknown", None
+
+
+def _extract_hnsw(info: Any) -> Tuple[int | None, int | None]:
+	hnsw = getattr(getattr(info, "config", None), "hnsw_config", None)
+	return getattr(hnsw, "m", None), getattr(hnsw, "ef_construct", None)
+
+
 def main() -> None:
 	parser = argparse.ArgumentParser(description="Ensure Qdrant collection exists (idempotent).")
 	parser.add_argument("--url", default=env("QDRANT_URL", "http://localhost:6333"))
 	parser.add_argument("--collection", default=env("QDRANT_COLLECTION", "amara_context_v1"))
-	parser.add_argument("--dim", type=int, default=int(env("EMBEDDING_DIM", "1536") or "1536"))
+	# EMBED_DIM (reduced-dimension embeddings, see embed.py) wins over the model's native EMBEDDING_DIM
+	parser.add_argument("--dim", type=int, default=int(env("EMBED_DIM") or env("EMBEDDING_DIM", "1536") or "1536"))
 	parser.add_argument(
 		"--distance",
 		default=env("QDRANT_DISTANCE", "cosine"),
 		choices=["cosine", "dot", "euclid"],
 	)
+	parser.add_argument(
+		"--quantization",
+		default=env("QDRANT_QUANTIZATION", "none"),
+		choices=list(QUANTIZATION_KINDS),
+		help="Keep a scalar (int8) or binary quantized copy of vectors for search; originals stay on disk.",
+	)
+	parser.add_argument(
+		"--quantization-on-disk",
+		dest="always_ram",
+		action="store_false",
+		default=env("QDRANT_QUANTIZATION_ALWAYS_RAM", "1") != "0",
+		help="Do not pin quantized vectors in RAM (default: always_ram=true).",
+	)
+	parser.add_argument("--hnsw-m", type=int, default=int(env("QDRANT_HNSW_M", "16") or "16"))
+	parser.add_argument("--hnsw-ef-construct", type=int, default=int(env("QDRANT_HNSW_EF_CONSTRUCT", "128") or "128"))
 	parser.add_argument(
 		"--recreate",
 		action="store_true",
-		help="Drop & recreate if collection exists with a mismatched vector size/distance.",
+		help="Drop & recreate if collection exists with a mismatched vector size/distance; "
+		"update quantization/HNSW in place if only those differ.",
 	)
 	parser.add_argument(
 		"--skip-compat-check",
@@ -92,31 +207,60 @@ def main() -> None:
 		cli_kwargs.pop("check_compatibility", None)
 		cli = QdrantClient(**cli_kwargs)
 
+	create_kwargs = collection_kwargs(
+		args.dim,
+		dist_enum,
+		quantization=args.quantization,
+		always_ram=args.always_ram,
+		hnsw_m=args.hnsw_m,
+		hnsw_ef_construct=args.hnsw_ef_construct,
+	)
+
 	existing = [c.name for c in cli.get_collections().collections]
 	if args.collection not in existing:
-		print(f"[qdrant] creating collection '{args.collection}' (dim={args.dim}, distance={args.distance})")
-		cli.create_collection(
-			collection_name=args.collection,
-			vectors_config=VectorParams(size=args.dim, distance=dist_enum, on_disk=True),
-			hnsw_config=HnswConfigDiff(m=16, ef_construct=128),
+		print(
+			f"[qdrant] creating collection '{args.collection}' (dim={args.dim}, distance={args.distance}, "
+			f"quantization={args.quantization}, hnsw m={args.hnsw_m} ef_construct={args.hnsw_ef_construct})"
 		)
+		cli.create_collection(collection_name=args.collection, **create_kwargs)
 	else:
 		info = cli.get_collection(args.collection)
 		dim_str, dist_str = _extract_dim_distance(info)
-		print(f"[qdrant] exists: '{args.collection}' dim={dim_str} distance={dist_str}")
+		q_kind, q_ram = _extract_quantization(info)
+		m, ef = _extract_hnsw(info)
+		print(
+			f"[qdrant] exists: '{args.collection}' dim={dim_str} distance={dist_str} "
+			f"quantization={q_kind} always_ram={q_ram} hnsw m={m} ef_construct={ef}"
+		)
+
+		want_dim = str(args.dim)
+		want_dist = dist_enum.value if hasattr(dist_enum, "value") else str(dist_enum)
+		vectors_mismatch = dim_str != want_dim or str(dist_str).lower() != want_dist.lower()
+		quant_mismatch = q_kind != args.quantization or (
+			args.quantization != "none" and q_ram is not None and q_ram != args.always_ram
+		)
+		hnsw_mismatch = (m, ef) != (args.hnsw_m, args.hnsw_ef_construct)
 
 		# Optionally reconcile on mismatch
 		if args.recreate:
-			want_dim = str(args.dim)
-			want_dist = dist_enum.value if hasattr(dist_enum, "value") else str(dist_enum)
-			if dim_str != want_dim or str(dist_str).lower() != want_dist.lower():
+			if vectors_mismatch:
 				print(f"[qdrant] recreating '{args.collection}' to match dim={want_dim} distance={want_dist}")
 				cli.delete_collection(args.collection)
-				cli.create_collection(
+				cli.create_collection(collection_name=args.collection, **create_kwargs)
+			elif quant_mismatch or hnsw_mismatch:
+				# Quantization and HNSW params can change in place; Qdrant rebuilds them
+				# from the stored originals, so no points are lost.
+				print(
+					f"[qdrant] updating '{args.collection}' in place: quantization={args.quantization} "
+					f"always_ram={args.always_ram} hnsw m={args.hnsw_m} ef_construct={args.hnsw_ef_construct}"
+				)
+				cli.update_collection(
 					collection_name=args.collection,
-					vectors_config=VectorParams(size=args.dim, distance=dist_enum, on_disk=True),
-					hnsw_config=HnswConfigDiff(m=16, ef_construct=128),
+					hnsw_config=create_kwargs["hnsw_config"],
+					quantization_config=create_kwargs.get("quantization_config", Disabled.DISABLED),
 				)
+		elif vectors_mismatch or quant_mismatch or hnsw_mismatch:
+			print("[qdrant] config differs from requested; re-run with --recreate to reconcile")
 
 	# Brief list for visibility
 	print("[qdrant] collections:")
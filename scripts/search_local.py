@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# --- Amara Script Metadata ---
+# Repo: amara-core
+# Role: Offline top-k cosine search over the embeddings artifact (no Qdrant needed)
+# Owner: core
+# Secrets: reads $OPENAI_API_KEY if mode=openai (to embed queries)
+# Notes: Brute-force NumPy matmul; --check-qdrant reports Qdrant recall@k against it.
+# --------------------------------
+"""
+search_local.py
+
+Loads artifacts/chunks.embeddings.npy (see embed.py), normalises the matrix once,
+and answers top-k cosine queries with one matrix product per block of queries.
+Hits are mapped back to file/chunk through artifacts/chunks.manifest.json.
+
+Usage:
+  python scripts/search_local.py "how do I reset the collection" "EMBED_QDRANT_UPSERT"
+  python scripts/search_local.py -k 10 --queries-file queries.txt --json
+  python scripts/search_local.py --check-qdrant "qdrant grpc port"
+
+Queries are embedded with the same backend as embed.py (EMBED_MODE / OPENAI_EMBED_MODEL).
+"""
+
+import sys
+import json
+import argparse
+import importlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import embed
+
+try:
+	np = importlib.import_module("numpy")
+except Exception:
+	print("[ERR] numpy not installed: pip install numpy", file=sys.stderr)
+	sys.exit(2)
+
+QUERY_BLOCK = 256  # queries per matmul; bounds the (block x corpus) score matrix
+
+
+class LocalIndex:
+	"""Exact cosine index over the binary vector artifact."""
+
+	def __init__(self, out_dir: Optional[Path] = None) -> None:
+		out_dir = out_dir or embed.OUT
+		ids, matrix = embed.open_vector_artifact(out_dir)
+		self.ids: List[str] = ids
+		# One pass: copy out of the mmap and normalise, so every query is a plain dot product
+		self.matrix = _normalize(np.asarray(matrix, dtype=np.float32))
+		manifest_path = out_dir / "chunks.manifest.json"
+		manifest = json.loads(manifest_path.read_text(encoding="utf-8")) if manifest_path.exists() else []
+		# Deduplicated chunks share an id, so one vector may map to several locations
+		self.meta: Dict[str, List[Dict[str, Any]]] = {}
+		for e in manifest:
+			self.meta.setdefault(e["id"], []).append(e)
+
+	def search(self, queries: Any, k: int) -> List[List[Tuple[float, str]]]:
+		"""Return, per query row, the top-k (score, id) pairs by cosine similarity."""
+		queries = _normalize(np.asarray(queries, dtype=np.float32).reshape(-1, self.matrix.shape[1]))
+		k = min(k, len(self.ids))
+		results: List[List[Tuple[float, str]]] = []
+		if k <= 0:
+			return [[] for _ in range(len(queries))]
+		for start in range(0, len(queries), QUERY_BLOCK):
+			scores = queries[start : start + QUERY_BLOCK] @ self.matrix.T
+			# argpartition is O(n) per row; only the k winners get sorted
+			top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+			top_scores = np.take_along_axis(scores, top, axis=1)
+			order = np.argsort(-top_scores, axis=1)
+			top = np.take_along_axis(top, order, axis=1)
+			top_scores = np.take_along_axis(top_scores, order, axis=1)
+			for row_idx, row_scores in zip(top, top_scores):
+				results.append([(float(sc), self.ids[i]) for i, sc in zip(row_idx, row_scores)])
+		return results
+
+	def describe(self, doc_id: str) -> Dict[str, Any]:
+		entries = self.meta.get(doc_id) or [{}]
+		return {
+			"id": doc_id,
+			"file": entries[0].get("file"),
+			"chunk": entries[0].get("chunk"),
+			"duplicates": [{"file": e["file"], "chunk": e["chunk"]} for e in entries[1:]],
+		}
+
+
+def _normalize(m: Any) -> Any:
+	norms = np.linalg.norm(m, axis=1, keepdims=True)
+	norms[norms == 0] = 1.0
+	return m / norms
+
+
+def qdrant_recall(index: LocalIndex, qvecs: Any, exact: List[List[Tuple[float, str]]], k: int) -> List[float]:
+	"""Recall@k of Qdrant's (approximate) search against the exact brute-force results."""
+	client, qm, collection = embed._qdrant()
+	qdrant_init = importlib.import_module("qdrant_init")
+	requests = [
+		qm.QueryRequest(query=list(map(float, v)), limit=k, params=qdrant_init.search_params(), with_payload=["source_id"])
+		for v in qvecs
+	]
+	responses = client.query_batch_points(collection_name=collection, requests=requests)
+	recalls = []
+	for resp, truth in zip(responses, exact):
+		got = {(pt.payload or {}).get("source_id") for pt in resp.points}
+		want = {doc_id for _, doc_id in truth}
+		recalls.append(len(got & want) / max(1, len(want)))
+	return recalls
+
+
+def main(argv: List[str]) -> int:
+	parser = argparse.ArgumentParser(description="Offline top-k cosine search over the embeddings artifact.")
+	parser.add_argument("queries", nargs="*", help="Query strings (batched into one embedding call)")
+	parser.add_argument("--queries-file", type=Path, help="File with one query per line")
+	parser.add_argument("-k", "--top-k", type=int, default=5)
+	parser.add_argument("--json", action="store_true", help="Print results as JSON")
+	parser.add_argument("--check-qdrant", action="store_true", help="Also report Qdrant recall@k against exact results")
+	args = parser.parse_args(argv)
+
+	queries = list(args.queries)
+	if args.queries_file:
+		queries += [ln.strip() for ln in args.queries_file.read_text(encoding="utf-8").splitlines() if ln.strip()]
+	if not queries:
+		parser.error("no queries given")
+
+	try:
+		index = LocalIndex()
+	except FileNotFoundError as e:
+		print(f"[ERR] missing embeddings artifact ({e.filename}); run embed.py first", file=sys.stderr)
+		return 1
+
+	qvecs = np.asarray(embed.embed_texts(queries), dtype=np.float32)
+	hits = index.search(qvecs, args.top_k)
+
+	if args.json:
+		out = [
+			{"query": q, "hits": [dict(index.describe(doc_id), score=round(sc, 6)) for sc, doc_id in row]}
+			for q, row in zip(queries, hits)
+		]
+		print(json.dumps(out, indent=2))
+	else:
+		for q, row in zip(queries, hits):
+			print(f"# {q}")
+			for rank, (sc, doc_id) in enumerate(row, 1):
+				d = index.describe(doc_id)
+				dups = f" +{len(d['duplicates'])} dup" if d["duplicates"] else ""
+				print(f"  {rank:>2}. {sc:.4f}  {d['file']}::{d['chunk']}{dups}  ({doc_id})")
+
+	if args.check_qdrant:
+		recalls = qdrant_recall(index, qvecs, hits, args.top_k)
+		print(
+			f"[OK] Qdrant recall@{args.top_k}: mean={sum(recalls) / len(recalls):.3f} min={min(recalls):.3f} over {len(recalls)} queries",
+			file=sys.stderr if args.json else sys.stdout,
+		)
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv[1:]))
@@ -4,7 +4,7 @@
 # Role: Sync/Stage allowed files from external sources into docs/context/
 # Owner: core
 # Secrets: none (reads public paths only; optional GITHUB_TOKEN for HTTPS)
-# Notes: Controlled by docs/sources.yaml; dry-run by default; writes artifacts/sync.report.json
+# Notes: Controlled by docs/sources.yaml; dry-run by default; writes artifacts/sync.report.json[l] + sync.summary.json
 # --------------------------------
 """
 sync_repos.py
@@ -37,19 +37,40 @@ Environment:
   SYNC_DRY=1 (default)  → plan only, no file copies
   SYNC_DRY=0            → actually copy files
   DRY=1/0               → alias for SYNC_DRY
+  SYNC_WORKERS=4        → sources synced concurrently (1 = sequential)
+  SYNC_MIRRORS=1        → git sources use persistent partial+sparse mirrors, updated by incremental
+                          fetch (0 = fresh shallow clone per run); SYNC_MIRROR_DIR overrides the
+                          location (default $AMARA_STORAGE/amara-git-mirrors, else artifacts/git-mirrors)
+  SYNC_GIT_CHECKOUT=0   → mirrored git sources are staged straight from the object store: ls-tree
+                          selects paths, blob ids detect changes, changed blobs are fetched in one
+                          batch (1 = keep a sparse working copy and stage from it like a local source)
+  SYNC_REPORT=json      → artifacts/sync.report.json (every file, written at the end) | jsonl: stream one
+                          line per file to artifacts/sync.report.jsonl as it is processed (constant memory);
+                          either way artifacts/sync.summary.json holds per-source counts, bytes and seconds
+  SYNC_LINK=auto        → how changed files are staged: auto (reflink, else copy) | reflink | hardlink | copy
+                          (staging is incremental; per-destination manifests live in artifacts/sync-state/)
   GITHUB_TOKEN / GH_TOKEN → used for HTTPS git clone auth (http.extraheader)
+  METRICS=0 / METRICS_DIR → per-stage metrics (artifacts/sync.metrics.{json,prom}), see lib/metrics.py
 """
 
 from __future__ import annotations
 import os
+import re
 import sys
 import json
 import shutil
+import hashlib
 import fnmatch
 import subprocess
 import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from lib.metrics import RunMetrics
 
 def ensure_dir(p: Path) -> None:
     """
@@ -86,12 +107,19 @@ DEST_ROOT = ROOT / "docs" / "context" / "sources"
 ARTIFACTS = ROOT / "artifacts"
 ARTIFACTS.mkdir(parents=True, exist_ok=True)
 DEST_ROOT.mkdir(parents=True, exist_ok=True)
+# Per-destination staging manifests: {rel: {src: [size, mtime_ns], dst: [size, mtime_ns], sha1}}
+STATE_DIR = ARTIFACTS / "sync-state"
+FICLONE = 0x40049409  # linux/fs.h: share the source's extents (btrfs, XFS, bcachefs)
+
+# Per-stage timings for this run (clone / walk / copy); main() writes artifacts/sync.metrics.{json,prom}
+METRICS = RunMetrics("sync")
 
 
-def sha1_bytes(b: bytes) -> str:
-    import hashlib as _h
-    h = _h.sha1()
-    h.update(b)
+def sha1_file(p: Path) -> str:
+    h = hashlib.sha1()
+    with p.open("rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
     return h.hexdigest()
 
 
@@ -99,69 +127,521 @@ def load_yaml(p: Path) -> Dict[str, Any]:
     return yaml.safe_load(p.read_text(encoding="utf-8")) or {}
 
 
-def collect_files(base: Path, includes: List[str], excludes: List[str]) -> List[Path]:
-    # inclusive: union of include globs
-    matched: set[Path] = set()
-    for patt in includes or []:
-        for path in base.rglob("*"):
-            if path.is_file():
-                rel = path.relative_to(base).as_posix()
-                if fnmatch.fnmatch(rel, patt):
-                    matched.add(path)
-    # apply excludes
-    results: List[Path] = []
-    for p in sorted(matched):
-        rel = p.relative_to(base).as_posix()
-        if any(fnmatch.fnmatch(rel, ex) for ex in (excludes or [])):
-            continue
-        results.append(p)
-    return results
+class PathMatcher:
+    """
+    Include/exclude glob sets compiled once (fnmatch semantics, POSIX relative paths).
+
+    Besides matching files it answers whether a directory can be skipped without
+    descending into it:
+      - every file below it is excluded: an exclude of the form "<prefix>/*" or
+        "<prefix>/**" whose <prefix>/ matches "dir/" (e.g. "**/node_modules/**", ".git/**")
+      - no include can match below it: a file can only match a glob if it starts with
+        the glob's literal prefix (the part before the first wildcard), so "docs/**/*.md"
+        never needs to look inside "scripts/"
+    """
 
+    _WILDCARDS = re.compile(r"[*?\[]")
 
-def copy_one(src: Path, dst: Path, *, dry: bool) -> Tuple[str, str]:
-    dst.parent.mkdir(parents=True, exist_ok=True)
+    def __init__(self, includes: Iterable[str], excludes: Iterable[str]) -> None:
+        self.includes = list(includes or [])
+        self.excludes = list(excludes or [])
+        self._include = self._compile(self.includes)
+        self._exclude = self._compile(self.excludes)
+        # "<prefix>/" globs whose match means "everything below is excluded"
+        self._exclude_dirs = self._compile(
+            ex.rstrip("*") for ex in self.excludes if ex.endswith("*") and ex.rstrip("*").endswith("/")
+        )
+        self._prefixes = [self._WILDCARDS.split(p, 1)[0] for p in self.includes]
+
+    @staticmethod
+    def _compile(patterns: Iterable[str]) -> "re.Pattern[str] | None":
+        parts = [fnmatch.translate(p) for p in patterns]
+        return re.compile("|".join(f"(?:{p})" for p in parts)) if parts else None
+
+    def match(self, rel: str) -> bool:
+        """True if the relative file path is included and not excluded."""
+        if self._include is None or not self._include.match(rel):
+            return False
+        return self._exclude is None or not self._exclude.match(rel)
+
+    def prune(self, rel_dir: str) -> bool:
+        """True if nothing under the relative directory can be selected."""
+        d = rel_dir + "/"
+        if self._exclude_dirs is not None and self._exclude_dirs.match(d):
+            return True
+        return not any(p.startswith(d) or d.startswith(p) for p in self._prefixes)
+
+    def sparse_patterns(self) -> List[str]:
+        """
+        Non-cone sparse-checkout patterns covering (at least) every file match() can select,
+        so a partial clone only ever fetches blobs we may stage. fnmatch's "*" also crosses
+        "/", so each include maps to its literal directory plus, where that is provably a
+        superset, a basename filter:  "docs/**/*.md" -> "/docs/**/*.md", "README.md" -> "/README.md",
+        anything else -> "/<literal dir>/**". Whole-directory excludes become negations.
+        """
+        patterns: List[str] = []
+        for inc, prefix in zip(self.includes, self._prefixes):
+            if prefix == inc:  # no wildcard at all
+                patterns.append("/" + inc)
+                continue
+            lit_dir = prefix[: prefix.rfind("/") + 1]
+            last = inc[inc.rfind("/") + 1 :]
+            tail = last[1:] if last.startswith("*") else last
+            if "/" in inc[len(lit_dir) :] and not self._WILDCARDS.search(last):
+                # ".../index.md": the basename itself is literal
+                patterns.append(f"/{lit_dir}**/{last}")
+            elif last.startswith("*") and tail and not self._WILDCARDS.search(tail):
+                # "*.md": any match ends in ".md", and so does its basename
+                patterns.append(f"/{lit_dir}**/*{tail}")
+            else:
+                patterns.append(f"/{lit_dir}**")
+        for ex in self.excludes:
+            m = re.fullmatch(r"(\*\*/)?([^*?\[]+)/\*\*?", ex)
+            if m:
+                # "**/x/**" needs at least one parent directory in fnmatch, hence "/*/**/x/"
+                patterns.append(f"!/*/**/{m.group(2)}/**" if m.group(1) else f"!/{m.group(2)}/**")
+        return patterns
+
+    def walk(self, base: Path) -> Iterator[Path]:
+        """
+        Yield matching files under base in one os.scandir pass. Like Path.rglob, symlinked
+        directories are not descended into, symlinked files are followed, and unreadable
+        directories are skipped.
+        """
+        stack = [""]
+        while stack:
+            rel_dir = stack.pop()
+            try:
+                with os.scandir(base / rel_dir if rel_dir else base) as it:
+                    entries = list(it)
+            except (PermissionError, FileNotFoundError, NotADirectoryError):
+                continue
+            for entry in entries:
+                rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not self.prune(rel):
+                            stack.append(rel)
+                        continue
+                    is_file = entry.is_file()
+                except OSError:
+                    continue
+                if is_file and self.match(rel):
+                    yield base / rel
+
+
+def collect_files(base: Path, includes: List[str], excludes: List[str]) -> List[Path]:
+    # union of include globs minus excludes, from a single pruned walk
+    return sorted(PathMatcher(includes, excludes).walk(base))
+
+
+def _reflink(src: Path, dst: Path) -> bool:
+    """Copy-on-write clone of src at dst; False (and no dst) where the filesystem can't."""
+    try:
+        import fcntl
+    except ImportError:  # Windows
+        return False
+    try:
+        with src.open("rb") as s, dst.open("wb") as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        return True
+    except OSError:
+        dst.unlink(missing_ok=True)
+        return False
+
+
+def copy_one(src: Path, dst: Path, *, dry: bool, link: str = "auto") -> Tuple[str, str]:
+    """
+    Materialize src at dst (atomically, via a temp file + rename), keeping src's mtime.
+    link: auto (reflink, else copy) | reflink | hardlink (shares the inode; else copy) | copy
+    Returns (status, method actually used).
+    """
     if dry:
         return ("DRY", "")
-    if dst.exists():
-        s = src.read_bytes()
-        d = dst.read_bytes()
-        if len(s) == len(d) and sha1_bytes(s) == sha1_bytes(d):
-            return ("SKIP", "identical")
-    shutil.copy2(src, dst)
-    return ("COPIED", "")
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(f".{dst.name}.sync-tmp")
+    tmp.unlink(missing_ok=True)
+    method = "copy"
+    if link == "hardlink":
+        try:
+            os.link(src, tmp)
+            method = "hardlink"
+        except OSError:
+            pass
+    elif link in ("auto", "reflink") and _reflink(src, tmp):
+        shutil.copystat(src, tmp)
+        method = "reflink"
+    if method == "copy":
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+    return ("COPIED", method)
+
+
+def _sig(st: os.stat_result) -> List[int]:
+    return [st.st_size, st.st_mtime_ns]
+
+
+def stage_file(src: Path, dst: Path, prev: Dict[str, Any] | None, *, dry: bool, link: str) -> Tuple[str, str, Dict[str, Any] | None]:
+    """
+    Bring one staged file up to date using its previous manifest record.
+      unchanged: src and dst stats match the record → no reads at all
+      identical: content hash matches the record (e.g. fresh git checkout) → dst untouched
+      otherwise: copied
+    Returns (status, note, new record); dst keeps its mtime unless it was rewritten.
+    """
+    src_sig = _sig(src.stat())
+    try:
+        dst_sig = _sig(dst.stat())
+    except FileNotFoundError:
+        dst_sig = None
+    if prev and dst_sig and prev.get("src") == src_sig and prev.get("dst") == dst_sig:
+        return ("SKIP", "unchanged", prev)
+    if dry:
+        return ("DRY", "new" if dst_sig is None else "changed", None)
+    digest = sha1_file(src)
+    if prev and dst_sig and prev.get("dst") == dst_sig and prev.get("sha1") == digest:
+        return ("SKIP", "identical", dict(prev, src=src_sig))
+    status, method = copy_one(src, dst, dry=False, link=link)
+    return (status, method, {"src": src_sig, "dst": _sig(dst.stat()), "sha1": digest})
+
+
+def _state_path(dest_name: str) -> Path:
+    return STATE_DIR / f"{dest_name.replace('/', '__')}.json"
+
+
+def load_state(dest_name: str) -> Dict[str, Any] | None:
+    """Previous staging manifest for a destination, or None if there is none (or it is unreadable)."""
+    try:
+        state = json.loads(_state_path(dest_name).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return state.get("files") if isinstance(state, dict) else None
+
+
+def save_state(dest_name: str, files: Dict[str, Any]) -> None:
+    path = _state_path(dest_name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps({"version": 1, "files": files}, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, path)
 
 
-def stage_from_base(name: str, base: Path, includes: List[str], excludes: List[str], dest_name: str, *, dry: bool) -> Dict[str, Any]:
+def _remove_staged(dest_base: Path, rel: str) -> None:
+    """Delete a staged file and any directories it leaves empty (up to dest_base)."""
+    p = dest_base / rel
+    p.unlink(missing_ok=True)
+    parent = p.parent
+    while parent != dest_base:
+        try:
+            parent.rmdir()
+        except OSError:
+            break
+        parent = parent.parent
+
+
+class JsonlReport:
+    """
+    Streaming report (SYNC_REPORT=jsonl): one JSON object per line, written as files are
+    processed, so memory does not grow with the number of files. Line types:
+      {"type": "run", ...}     header (dry_run, started, sources)
+      {"type": "file", ...}    source, action (copied|skipped|deleted|denied), src, dst, note[, bytes]
+      {"type": "source", ...}  per-source counts/bytes/seconds once that source is done
+    Sources run concurrently, so file lines of different sources interleave.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._fh = path.open("w", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._fh.write(line)
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+class SourceReport:
+    """
+    Outcome of staging one source. Per-file records are kept for sync.report.json
+    (SYNC_REPORT=json) or handed to a JsonlReport and only counted (SYNC_REPORT=jsonl).
+    """
+
+    KINDS = ("copied", "skipped", "deleted", "denied")
+
+    def __init__(self, name: str, base: str, dest_base: Path, *, dry: bool, stream: JsonlReport | None = None) -> None:
+        self.name = name
+        self.base = base
+        self.dest_base = dest_base
+        self.dry = dry
+        self.stream = stream
+        self.included = 0
+        self.counts = dict.fromkeys(self.KINDS, 0)
+        self.unchanged = 0
+        self.bytes = 0
+        self.files: Dict[str, List[Dict[str, Any]]] | None = None if stream else {k: [] for k in self.KINDS}
+        self._t0 = time.perf_counter()
+
+    def add(self, kind: str, record: Dict[str, Any], nbytes: int = 0) -> None:
+        self.counts[kind] += 1
+        self.bytes += nbytes
+        if kind == "skipped" and record["note"] in ("unchanged", "identical"):
+            self.unchanged += 1
+        if self.files is not None:
+            self.files[kind].append(record)
+        else:
+            line = {"type": "file", "source": self.name, "action": kind, **record}
+            if nbytes:
+                line["bytes"] = nbytes
+            self.stream.write(line)
+
+    def result(self) -> Dict[str, Any]:
+        res: Dict[str, Any] = {
+            "name": self.name,
+            "base": self.base,
+            "dest": self.dest_base.as_posix(),
+            "dry_run": self.dry,
+            "counts": {
+                "included": self.included,
+                "copied": self.counts["copied"],
+                "skipped": self.counts["skipped"],
+                "unchanged": self.unchanged,
+                "deleted": self.counts["deleted"],
+                "denied": self.counts["denied"],
+            },
+            "bytes": self.bytes,
+            "seconds": round(time.perf_counter() - self._t0, 3),
+        }
+        if self.files is not None:
+            res.update(self.files)
+        return res
+
+
+def delete_stale(report: SourceReport, prev_state: Dict[str, Any] | None, selected: set, *, dry: bool) -> None:
+    """Remove staged files that are no longer selected (per the previous manifest, or on disk if none)."""
+    dest_base = report.dest_base
+    with METRICS.stage("delete") as st:
+        if prev_state is not None:
+            stale = set(prev_state) - selected
+        elif dest_base.is_dir():
+            # No manifest yet (first incremental run): reconcile against what is on disk
+            stale = {
+                p.relative_to(dest_base).as_posix()
+                for p in dest_base.rglob("*")
+                if (p.is_file() or p.is_symlink()) and p.relative_to(dest_base).as_posix() not in selected
+            }
+        else:
+            stale = set()
+        for rel in sorted(stale):
+            if not dry:
+                _remove_staged(dest_base, rel)
+            report.add("deleted", {"dst": (dest_base / rel).as_posix(), "note": "dry" if dry else ""})
+        st.add(items=len(stale))
+
+
+def stage_from_base(name: str, base: Path, includes: List[str], excludes: List[str], dest_name: str, *, dry: bool,
+                    stream: JsonlReport | None = None) -> Dict[str, Any]:
+    """
+    Incrementally mirror the selected files of base into docs/context/sources/<dest>:
+    only new/changed files are written and only files no longer selected are removed.
+    SYNC_LINK=auto|reflink|hardlink|copy picks how changed files are materialized.
+    """
     dest_base = DEST_ROOT / dest_name
-    if not dry and dest_base.exists():
-        shutil.rmtree(dest_base)
-    files = collect_files(base, includes, excludes)
-    copied, skipped, denied = [], [], []
-
-    for f in files:
-        # (Excludes already applied in collect; keep placeholder for symmetry)
-        rel = f.relative_to(base)
-        dst = dest_base / rel
-        status, note = copy_one(f, dst, dry=dry)
-        (copied if status == "COPIED" else skipped).append(
-            {"src": f.as_posix(), "dst": dst.as_posix(), "note": note}
+    link = os.getenv("SYNC_LINK", "auto")
+    prev_state = load_state(dest_name)
+    report = SourceReport(name, base.as_posix(), dest_base, dry=dry, stream=stream)
+    with METRICS.stage("walk") as st:
+        files = collect_files(base, includes, excludes)
+        st.add(items=len(files))
+    report.included = len(files)
+    state: Dict[str, Any] = {}
+
+    with METRICS.stage("copy") as st:
+        for f in files:
+            # (Excludes already applied in collect; keep placeholder for symmetry)
+            rel = f.relative_to(base).as_posix()
+            dst = dest_base / rel
+            status, note, record = stage_file(f, dst, (prev_state or {}).get(rel), dry=dry, link=link)
+            if record is not None:
+                state[rel] = record
+            nbytes = record["dst"][0] if status == "COPIED" else 0
+            report.add("copied" if status == "COPIED" else "skipped",
+                       {"src": f.as_posix(), "dst": dst.as_posix(), "note": note}, nbytes)
+            if status == "COPIED":
+                st.add(items=1, nbytes=nbytes)
+
+    selected = {f.relative_to(base).as_posix() for f in files}
+    delete_stale(report, prev_state, selected, dry=dry)
+    if not dry:
+        save_state(dest_name, state)
+    return report.result()
+
+
+def git_blob_id(p: Path) -> str:
+    """The object id git would give this file's content (sha1 of "blob <size>\\0" + content)."""
+    h = hashlib.sha1(f"blob {p.stat().st_size}\0".encode("ascii"))
+    with p.open("rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def git_tree_files(repo: Path, commit: str) -> Iterator[Tuple[str, str, str]]:
+    """
+    Yield (mode, object id, path) for every blob and submodule (gitlink, mode 160000)
+    in the commit's tree (trees only; no blob reads).
+    """
+    out = _git(repo, "ls-tree", "-r", "-z", "--full-tree", commit)
+    for rec in out.split("\0"):
+        if not rec:
+            continue
+        meta, path = rec.split("\t", 1)
+        mode, kind, oid = meta.split(" ")
+        if kind in ("blob", "commit"):
+            yield mode, oid, path
+
+
+def refetch_unfiltered(repo: Path, ref: str | None, extra_http_header: str | None = None) -> None:
+    """
+    Fallback for servers that refuse wants for unadvertised objects (protocol v0 without
+    uploadpack.allowAnySHA1InWant / allowReachableSHA1InWant; v2 servers accept them):
+    neither a batched blob fetch nor git's own lazy fetch works there, so fetch ref's tip
+    again without the blob filter (every blob of that one commit, still shallow).
+    The mirror keeps its partial-clone filter for later fetches. Needs git >= 2.36.
+    """
+    _git(repo, "fetch", "-q", "--refetch", "--no-filter", "--depth", "1", "--no-tags", "--no-write-fetch-head",
+         "origin", ref or "HEAD", extra_http_header=extra_http_header)
+
+
+def fetch_missing_blobs(repo: Path, commit: str, oids: set, extra_http_header: str | None = None, *,
+                        ref: str | None = None) -> int:
+    """
+    In a partial clone, fetch the wanted blobs that are not local yet in one request
+    (instead of one lazy fetch per blob on first read). Returns how many were fetched.
+    If the server refuses the oid wants, falls back to refetch_unfiltered(ref).
+    """
+    listing = _git(repo, "rev-list", "--objects", "--missing=print", commit)
+    missing = sorted({line[1:] for line in listing.splitlines() if line.startswith("?")} & oids)
+    if missing:
+        cmd = ["git"]
+        if extra_http_header:
+            cmd += ["-c", f"http.extraheader={extra_http_header}"]
+        cmd += ["-C", str(repo), "-c", "fetch.negotiationAlgorithm=noop", "fetch", "-q", "--no-tags",
+                "--no-write-fetch-head", "--recurse-submodules=no", "--stdin", "origin"]
+        try:
+            subprocess.run(cmd, env=os.environ, check=True, input="\n".join(missing) + "\n", text=True)
+        except subprocess.CalledProcessError:
+            print(f"[WARN] {repo.name}: server refused blob wants; refetching {ref or 'HEAD'} without the blob filter",
+                  file=sys.stderr)
+            refetch_unfiltered(repo, ref, extra_http_header)
+    return len(missing)
+
+
+class BlobReader:
+    """One long-lived `git cat-file --batch` process; blobs are streamed straight to files."""
+
+    def __init__(self, repo: Path) -> None:
+        self._proc = subprocess.Popen(
+            ["git", "-C", str(repo), "cat-file", "--batch"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=os.environ,
         )
 
-    return {
-        "name": name,
-        "base": base.as_posix(),
-        "dest": dest_base.as_posix(),
-        "dry_run": dry,
-        "counts": {
-            "included": len(files),
-            "copied": len([c for c in copied]),
-            "skipped": len(skipped),
-            "denied": len(denied),
-        },
-        "copied": copied,
-        "skipped": skipped,
-        "denied": denied,
-    }
+    def write_to(self, oid: str, dst: Path) -> int:
+        """Write blob oid to dst atomically; returns its size."""
+        assert self._proc.stdin is not None and self._proc.stdout is not None
+        self._proc.stdin.write(oid.encode("ascii") + b"\n")
+        self._proc.stdin.flush()
+        header = self._proc.stdout.readline().split()
+        if len(header) != 3 or header[1] != b"blob":
+            raise RuntimeError(f"git cat-file: cannot read blob {oid}: {b' '.join(header).decode()}")
+        size = remaining = int(header[2])
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dst.with_name(f".{dst.name}.sync-tmp")
+        with tmp.open("wb") as fh:
+            while remaining:
+                block = self._proc.stdout.read(min(remaining, 1 << 20))
+                if not block:
+                    raise RuntimeError(f"git cat-file: truncated blob {oid}")
+                fh.write(block)
+                remaining -= len(block)
+        self._proc.stdout.read(1)  # trailing newline
+        os.replace(tmp, dst)
+        return size
+
+    def close(self) -> None:
+        if self._proc.stdin is not None:
+            self._proc.stdin.close()
+        self._proc.wait()
+
+
+def stage_from_git(name: str, repo: Path, commit: str, includes: List[str], excludes: List[str], dest_name: str, *,
+                   dry: bool, extra_http_header: str | None = None, stream: JsonlReport | None = None,
+                   ref: str | None = None) -> Dict[str, Any]:
+    """
+    Stage a git source straight from the object store: ls-tree lists paths, PathMatcher
+    selects them, and blob ids decide what changed. A file whose blob id matches the
+    manifest (and whose staged copy is untouched) is skipped without reading anything;
+    changed blobs are fetched in one batch and streamed out of one cat-file process.
+    Symlinks and submodules are not staged (reported as denied). `ref` is the mirrored
+    ref, used only if the server refuses blob wants (see refetch_unfiltered).
+    """
+    dest_base = DEST_ROOT / dest_name
+    prev_state = load_state(dest_name) or {}
+    had_state = _state_path(dest_name).exists()
+    matcher = PathMatcher(includes, excludes)
+    report = SourceReport(name, f"{repo.as_posix()}@{commit[:12]}", dest_base, dry=dry, stream=stream)
+    with METRICS.stage("walk") as st:
+        entries = [(mode, oid, path) for mode, oid, path in git_tree_files(repo, commit) if matcher.match(path)]
+        st.add(items=len(entries))
+    report.included = len(entries)
+
+    state: Dict[str, Any] = {}
+    todo: List[Tuple[str, str]] = []
+    selected = set()
+    for mode, oid, rel in entries:
+        dst = dest_base / rel
+        if mode in ("120000", "160000"):
+            report.add("denied", {"src": rel, "dst": dst.as_posix(), "note": "symlink" if mode == "120000" else "submodule"})
+            continue
+        selected.add(rel)
+        prev = prev_state.get(rel) or {}
+        try:
+            dst_sig = _sig(dst.stat())
+        except FileNotFoundError:
+            dst_sig = None
+        if dst_sig and prev.get("blob") == oid and prev.get("dst") == dst_sig:
+            state[rel] = prev
+            report.add("skipped", {"src": rel, "dst": dst.as_posix(), "note": "unchanged"})
+        elif dst_sig and not dry and git_blob_id(dst) == oid:
+            # Staged by another path (or first run with a manifest-less dest): content already matches
+            state[rel] = {"blob": oid, "dst": dst_sig}
+            report.add("skipped", {"src": rel, "dst": dst.as_posix(), "note": "identical"})
+        elif dry:
+            report.add("skipped", {"src": rel, "dst": dst.as_posix(), "note": "new" if dst_sig is None else "changed"})
+        else:
+            todo.append((oid, rel))
+
+    if todo:
+        with METRICS.stage("fetch") as st:
+            st.add(items=fetch_missing_blobs(repo, commit, {oid for oid, _ in todo}, extra_http_header, ref=ref))
+        reader = BlobReader(repo)
+        try:
+            with METRICS.stage("copy") as st:
+                for oid, rel in todo:
+                    dst = dest_base / rel
+                    size = reader.write_to(oid, dst)
+                    state[rel] = {"blob": oid, "dst": _sig(dst.stat())}
+                    report.add("copied", {"src": rel, "dst": dst.as_posix(), "note": "blob"}, size)
+                    st.add(items=1, nbytes=size)
+        finally:
+            reader.close()
+
+    delete_stale(report, prev_state if had_state else None, selected, dry=dry)
+    if not dry:
+        save_state(dest_name, state)
+    return report.result()
 
 
 def shallow_clone(url: str, ref: str | None, dest: Path, extra_http_header: str | None = None) -> None:
@@ -178,6 +658,92 @@ def shallow_clone(url: str, ref: str | None, dest: Path, extra_http_header: str
     subprocess.check_call(cmd, env=os.environ)
 
 
+def mirror_root() -> Path:
+    """SYNC_MIRROR_DIR, else $AMARA_STORAGE/amara-git-mirrors (if the storage dir exists), else artifacts/git-mirrors."""
+    explicit = os.getenv("SYNC_MIRROR_DIR")
+    if explicit:
+        return Path(explicit).expanduser()
+    storage = os.getenv("AMARA_STORAGE")
+    if storage and Path(storage).is_dir() and os.access(storage, os.W_OK):
+        return Path(storage) / "amara-git-mirrors"
+    return ARTIFACTS / "git-mirrors"
+
+
+def _git(repo: Path | None, *args: str, extra_http_header: str | None = None) -> str:
+    cmd = ["git"]
+    if extra_http_header:
+        # Passed per command (and inherited by lazy blob fetches), never stored in the mirror's config
+        cmd += ["-c", f"http.extraheader={extra_http_header}"]
+    if repo is not None:
+        cmd += ["-C", str(repo)]
+    cmd += list(args)
+    return subprocess.run(cmd, env=os.environ, check=True, stdout=subprocess.PIPE, text=True).stdout
+
+
+@contextmanager
+def _locked(path: Path) -> Iterator[None]:
+    """Exclusive lock so overlapping sync runs don't update the same mirror at once."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w") as fh:
+        try:
+            import fcntl
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        except ImportError:  # Windows: best effort
+            pass
+        yield
+
+
+def git_mirror(name: str, url: str, ref: str | None, matcher: PathMatcher, extra_http_header: str | None = None, *,
+               checkout: bool = True) -> Tuple[Path, str, str]:
+    """
+    Persistent partial (--filter=blob:none), shallow mirror of url@ref under mirror_root().
+    The first run clones; later runs fetch only the new tip. With checkout=True the mirror
+    keeps a sparse working copy (patterns derived from the source's includes; checkout
+    fetches just the blobs they select, unchanged files keep their mtimes); with
+    checkout=False nothing is checked out and stage_from_git reads the object store.
+    Returns (repo, "cloned" | "fetched", commit id).
+    """
+    key = hashlib.sha1(f"{url}#{ref or ''}".encode("utf-8")).hexdigest()[:12]
+    repo = mirror_root() / f"{re.sub(r'[^A-Za-z0-9_.-]', '_', name)}-{key}"
+    patterns = matcher.sparse_patterns()
+    rev = ref or "HEAD"
+    with _locked(repo.with_name(repo.name + ".lock")):
+        action = "cloned"
+        if (repo / ".git").is_dir():
+            try:
+                _git(repo, "fetch", "-q", "--depth", "1", "--filter=blob:none", "origin", rev, extra_http_header=extra_http_header)
+                action = "fetched"
+            except subprocess.CalledProcessError:
+                print(f"[WARN] {name}: mirror fetch failed; trying a fresh clone of {url}", file=sys.stderr)
+        if action == "cloned":
+            # Clone beside the old mirror and swap, so a network failure doesn't cost the cache
+            fresh = repo.with_name(repo.name + ".new")
+            shutil.rmtree(fresh, ignore_errors=True)
+            fresh.parent.mkdir(parents=True, exist_ok=True)
+            clone = ["clone", "-q", "--filter=blob:none", "--depth", "1", "--no-checkout"]
+            if ref:
+                clone += ["--branch", ref]
+            _git(None, *clone, url, str(fresh), extra_http_header=extra_http_header)
+            shutil.rmtree(repo, ignore_errors=True)
+            os.replace(fresh, repo)
+        target = "FETCH_HEAD" if action == "fetched" else "HEAD"
+        commit = _git(repo, "rev-parse", "--verify", f"{target}^{{commit}}").strip()
+        if checkout:
+            sparse_file = repo / ".git" / "info" / "sparse-checkout"
+            current = sparse_file.read_text(encoding="utf-8").split("\n") if sparse_file.exists() else []
+            if [p for p in current if p] != patterns:
+                _git(repo, "sparse-checkout", "set", "--no-cone", *patterns, extra_http_header=extra_http_header)
+            try:
+                _git(repo, "checkout", "-q", "--force", "--detach", commit, extra_http_header=extra_http_header)
+            except subprocess.CalledProcessError:
+                # Lazy blob fetches are oid wants too; see refetch_unfiltered
+                print(f"[WARN] {name}: checkout could not fetch blobs; refetching {rev} without the blob filter",
+                      file=sys.stderr)
+                refetch_unfiltered(repo, ref, extra_http_header)
+                _git(repo, "checkout", "-q", "--force", "--detach", commit, extra_http_header=extra_http_header)
+    return repo, action, commit
+
+
 def normalize_entry(entry: Dict[str, Any], name_fallback: str | None = None) -> tuple[str, Dict[str, Any], str]:
     """
     Returns (name, normalized_cfg, kind)
@@ -227,6 +793,92 @@ def iter_sources(spec: Any) -> Iterable[tuple[str, Dict[str, Any]]]:
         return
 
 
+def github_auth_header() -> str | None:
+    """HTTPS token header for git, if a token is available (GitHub Actions provides GITHUB_TOKEN)."""
+    gh_token = os.getenv("GITHUB_TOKEN") or os.getenv("GH_TOKEN")
+    return f"AUTHORIZATION: bearer {gh_token}" if gh_token else None
+
+
+def sync_source(raw_name: str, raw_cfg: Dict[str, Any], *, dry: bool, http_header: str | None,
+                stream: JsonlReport | None = None) -> Dict[str, Any]:
+    """Clone (if git) and stage one source; errors become an {"name", "error"} result."""
+    res = _sync_source(raw_name, raw_cfg, dry=dry, http_header=http_header, stream=stream)
+    if stream is not None:
+        stream.write({"type": "source", **res})
+    return res
+
+
+def _sync_source(raw_name: str, raw_cfg: Dict[str, Any], *, dry: bool, http_header: str | None,
+                 stream: JsonlReport | None) -> Dict[str, Any]:
+    try:
+        name, norm, kind = normalize_entry(raw_cfg or {}, name_fallback=raw_name)
+        if kind == "git" and os.getenv("SYNC_MIRRORS", "1") != "0":
+            url = norm["_git_url"]
+            header = http_header if url.startswith("http") else None
+            checkout = os.getenv("SYNC_GIT_CHECKOUT", "0") == "1"
+            with METRICS.stage("clone") as st:
+                repo_dir, action, commit = git_mirror(
+                    name, url, norm["_git_ref"], PathMatcher(norm["include"], norm["exclude"]),
+                    extra_http_header=header, checkout=checkout,
+                )
+                st.add(items=1)
+            METRICS.inc(f"mirror_{action}")
+            if checkout:
+                res = stage_from_base(name, repo_dir, norm["include"], norm["exclude"], norm["dest"], dry=dry,
+                                      stream=stream)
+            else:
+                res = stage_from_git(name, repo_dir, commit, norm["include"], norm["exclude"], norm["dest"],
+                                     dry=dry, extra_http_header=header, stream=stream, ref=norm["_git_ref"])
+        elif kind == "git":
+            with tempfile.TemporaryDirectory(prefix=f"sync_{name}_") as td:
+                repo_dir = Path(td) / "repo"
+                url = norm["_git_url"]
+                ref = norm["_git_ref"]
+                with METRICS.stage("clone") as st:
+                    shallow_clone(
+                        url, ref, repo_dir,
+                        extra_http_header=(http_header if url.startswith("http") else None),
+                    )
+                    st.add(items=1)
+                res = stage_from_base(name, repo_dir, norm["include"], norm["exclude"], norm["dest"], dry=dry,
+                                      stream=stream)
+        else:
+            base = Path(norm["base"]).expanduser().resolve()
+            res = stage_from_base(name, base, norm["include"], norm["exclude"], norm["dest"], dry=dry, stream=stream)
+
+        print(
+            f"[OK] {name}: copied={res['counts']['copied']} skipped={res['counts']['skipped']} "
+            f"deleted={res['counts']['deleted']} denied={res['counts']['denied']}"
+        )
+        return res
+
+    except Exception as e:
+        print(f"[ERR] {raw_name}: {e}", file=sys.stderr)
+        METRICS.inc("source_errors")
+        return {"name": raw_name, "error": str(e)}
+
+
+def sync_summary(results: List[Dict[str, Any]], *, dry: bool, started: float, report_path: Path) -> Dict[str, Any]:
+    """Per-source counts, bytes and durations without the per-file detail (artifacts/sync.summary.json)."""
+    sources = [{k: v for k, v in r.items() if k not in SourceReport.KINDS} for r in results]
+    totals: Dict[str, int] = {"sources": len(sources), "errors": 0, "bytes": 0}
+    for r in sources:
+        if "error" in r:
+            totals["errors"] += 1
+            continue
+        totals["bytes"] += r["bytes"]
+        for k, v in r["counts"].items():
+            totals[k] = totals.get(k, 0) + v
+    return {
+        "dry_run": dry,
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(started)),
+        "wall_seconds": round(time.time() - started, 3),
+        "report": report_path.relative_to(ROOT).as_posix() if report_path.is_relative_to(ROOT) else report_path.as_posix(),
+        "totals": totals,
+        "sources": sources,
+    }
+
+
 def main() -> int:
     if not SOURCES_FILE.exists():
         print(f"[ERR] missing config: {SOURCES_FILE}", file=sys.stderr)
@@ -240,40 +892,62 @@ def main() -> int:
 
     # Respect SYNC_DRY (preferred) or DRY (compat). Default: DRY (plan only).
     dry = (os.getenv("SYNC_DRY") or os.getenv("DRY") or "1") != "0"
+    METRICS.labels["dry_run"] = "1" if dry else "0"
 
+    report_mode = os.getenv("SYNC_REPORT", "json")
+    if report_mode not in ("json", "jsonl"):
+        print(f"[ERR] SYNC_REPORT must be json or jsonl, got {report_mode!r}", file=sys.stderr)
+        return 2
     report: Dict[str, Any] = {"dry_run": dry, "results": []}
-
-    # Prepare HTTPS token header if available (GitHub Actions provides GITHUB_TOKEN)
-    gh_token = os.getenv("GITHUB_TOKEN") or os.getenv("GH_TOKEN")
-    http_header = f"AUTHORIZATION: bearer {gh_token}" if gh_token else None
-
-    for raw_name, raw_cfg in iter_sources(sources_spec):
-        try:
-            name, norm, kind = normalize_entry(raw_cfg or {}, name_fallback=raw_name)
-            if kind == "git":
-                with tempfile.TemporaryDirectory(prefix=f"sync_{name}_") as td:
-                    repo_dir = Path(td) / "repo"
-                    url = norm["_git_url"]
-                    ref = norm["_git_ref"]
-                    shallow_clone(
-                        url, ref, repo_dir,
-                        extra_http_header=(http_header if url.startswith("http") else None),
-                    )
-                    res = stage_from_base(name, repo_dir, norm["include"], norm["exclude"], norm["dest"], dry=dry)
-            else:
-                base = Path(norm["base"]).expanduser().resolve()
-                res = stage_from_base(name, base, norm["include"], norm["exclude"], norm["dest"], dry=dry)
-
-            print(f"[OK] {name}: copied={res['counts']['copied']} skipped={res['counts']['skipped']} denied={res['counts']['denied']}")
-            report["results"].append(res)
-
-        except Exception as e:
-            print(f"[ERR] {raw_name}: {e}", file=sys.stderr)
-            report["results"].append({"name": raw_name, "error": str(e)})
-
-    out = ARTIFACTS / "sync.report.json"
-    out.write_text(json.dumps(report, indent=2), encoding="utf-8")
-    print(f"[OK] wrote {out}")
+    started = time.time()
+
+    http_header = github_auth_header()
+
+    # Sources are independent and network/IO bound, so they run on a bounded pool.
+    # Sources sharing a destination stay sequential (in config order) within one task.
+    sources = list(iter_sources(sources_spec))
+    groups: Dict[str, List[int]] = {}
+    for i, (raw_name, raw_cfg) in enumerate(sources):
+        dest = (raw_cfg or {}).get("dest") or (raw_cfg or {}).get("name") or raw_name
+        groups.setdefault(str(dest), []).append(i)
+    results: List[Dict[str, Any] | None] = [None] * len(sources)
+
+    stream = None
+    if report_mode == "jsonl":
+        out = ARTIFACTS / "sync.report.jsonl"
+        stream = JsonlReport(out)
+        stream.write({
+            "type": "run",
+            "dry_run": dry,
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(started)),
+            "sources": [name for name, _ in sources],
+        })
+
+    def _run_group(indices: List[int]) -> None:
+        for i in indices:
+            raw_name, raw_cfg = sources[i]
+            results[i] = sync_source(raw_name, raw_cfg, dry=dry, http_header=http_header, stream=stream)
+
+    workers = max(1, min(int(os.getenv("SYNC_WORKERS", "4")), len(groups) or 1))
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_run_group, groups.values()))
+    finally:
+        if stream is not None:
+            stream.close()
+    # Report order is config order, whatever order the sources finished in
+    report["results"] = [r for r in results if r is not None]
+
+    METRICS.inc("sources", len(report["results"]))
+    with METRICS.stage("report"):
+        if stream is None:
+            out = ARTIFACTS / "sync.report.json"
+            out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        summary = sync_summary(report["results"], dry=dry, started=started, report_path=out)
+        summary_out = ARTIFACTS / "sync.summary.json"
+        summary_out.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    print(f"[OK] wrote {out} and {summary_out.name}")
+    METRICS.finish(ARTIFACTS)
     if dry:
         print("[sync] DRY mode (no files copied). Set SYNC_DRY=0 to write files.")
     return 0
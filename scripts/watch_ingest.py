@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+# --- Amara Script Metadata ---
+# Repo: amara-core
+# Role: Long-running watch mode: sync changed sources, re-embed/upsert only the changed docs/context/ files
+# Owner: core
+# Secrets: reads $OPENAI_API_KEY if mode=openai; optional GITHUB_TOKEN for git source fetches
+# Notes: inotify via ctypes (Linux), stat polling elsewhere; bursts are debounced; idle = blocked in select()
+# --------------------------------
+"""
+watch_ingest.py
+
+Keeps Qdrant and the BM25 index seconds behind the files instead of one
+`make sync-apply && make embed-openai-upsert` behind:
+
+  local sources (docs/sources.yaml)  --inotify-->          sync_source() for that source only
+  git sources                        --every N seconds-->  sync_source() (incremental mirror fetch)
+  docs/context/                      --inotify-->          embed.embed_paths() + LexicalIndex.update_paths()
+
+Only files whose size/mtime differ from what this process last saw are re-embedded
+(the embed cache makes unchanged chunks free); deleted files lose their points.
+Changes are tracked from startup on, so start it after a full run; the startup
+sync of every source is incremental and only its changes are embedded.
+
+  EMBED_MODE=openai EMBED_QDRANT_UPSERT=1 python scripts/watch_ingest.py
+  python scripts/watch_ingest.py --once        # startup sync + embed of its changes, then exit
+
+Environment:
+  WATCH_BACKEND=auto        auto (inotify if available) | inotify | poll
+  WATCH_DEBOUNCE_MS=500     quiet period that ends a burst of events
+  WATCH_MAX_DELAY_MS=5000   a continuous stream of events is still flushed this often
+  WATCH_GIT_INTERVAL=300    seconds between git source fetches (0 = never)
+  WATCH_POLL_INTERVAL=2     seconds between tree scans with the poll backend
+  WATCH_CACHE_TRIM_INTERVAL=600  seconds between embed cache evictions (EMBED_CACHE_MAX_MB)
+Sync always writes (SYNC_DRY is ignored); embed.py's EMBED_* / QDRANT_* settings apply.
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import signal
+import struct
+import argparse
+import ctypes
+import ctypes.util
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import embed
+import sync_repos
+from lib.metrics import RunMetrics
+from lexical_index import LexicalIndex
+from sync_repos import PathMatcher
+
+# <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+# Writes are reported once, on close; sync and editors replace files via rename (MOVED_TO)
+WATCH_MASK = (
+	IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+	| IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK
+)
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len; then `len` bytes of NUL-padded name
+
+Sig = Optional[Tuple[int, int]]
+
+
+def file_sig(p: Path) -> Sig:
+	try:
+		st = p.stat()
+	except OSError:
+		return None
+	return (st.st_size, st.st_mtime_ns)
+
+
+def walk_dirs(root: Path, want_dir: Callable[[Path], bool]) -> Iterable[Path]:
+	"""root and every wanted directory below it (symlinked directories are not followed)."""
+	stack = [root]
+	while stack:
+		d = stack.pop()
+		yield d
+		try:
+			with os.scandir(d) as it:
+				entries = list(it)
+		except OSError:
+			continue
+		for entry in entries:
+			if entry.is_dir(follow_symlinks=False) and want_dir(Path(entry.path)):
+				stack.append(Path(entry.path))
+
+
+# ---------- change sources ----------
+class InotifyWatcher:
+	"""
+	Recursive inotify: one watch per wanted directory, added as directories appear.
+	wait() returns the paths that changed (files or directories), an empty set on
+	timeout, or None when the kernel queue overflowed and everything must be rescanned.
+	"""
+
+	def __init__(self, roots: List[Path], want_dir: Callable[[Path], bool]) -> None:
+		self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+		if not hasattr(self._libc, "inotify_init1"):
+			raise OSError(errno.ENOSYS, "inotify is not available on this platform")
+		self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+		if self.fd < 0:
+			raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+		self.want_dir = want_dir
+		self._wds: Dict[int, Path] = {}
+		for root in roots:
+			self.add_tree(root)
+
+	def add_tree(self, root: Path) -> None:
+		for d in walk_dirs(root, self.want_dir):
+			wd = self._libc.inotify_add_watch(self.fd, os.fsencode(d), WATCH_MASK)
+			if wd >= 0:
+				self._wds[wd] = d
+			elif ctypes.get_errno() == errno.ENOSPC:
+				raise OSError(errno.ENOSPC, f"inotify watch limit reached at {d}; raise fs.inotify.max_user_watches or use WATCH_BACKEND=poll")
+			# Otherwise the directory vanished or is unreadable: nothing to watch
+
+	def wait(self, timeout: Optional[float]) -> Optional[Set[Path]]:
+		ready, _, _ = select.select([self.fd], [], [], timeout)
+		if not ready:
+			return set()
+		try:
+			data = os.read(self.fd, 256 * 1024)
+		except BlockingIOError:
+			return set()
+		changed: Set[Path] = set()
+		overflow = False
+		offset = 0
+		while offset < len(data):
+			wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+			name = data[offset + _EVENT.size : offset + _EVENT.size + length].rstrip(b"\0")
+			offset += _EVENT.size + length
+			if mask & IN_Q_OVERFLOW:
+				overflow = True
+				continue
+			if mask & IN_IGNORED:
+				self._wds.pop(wd, None)
+				continue
+			base = self._wds.get(wd)
+			if base is None:
+				continue
+			path = base / os.fsdecode(name) if name else base
+			if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and self.want_dir(path):
+				self.add_tree(path)
+			changed.add(path)
+		return None if overflow else changed
+
+	def close(self) -> None:
+		os.close(self.fd)
+
+
+class PollWatcher:
+	"""Fallback without inotify: rescan the wanted trees every `interval` seconds and diff (size, mtime)."""
+
+	def __init__(self, roots: List[Path], want_dir: Callable[[Path], bool], interval: float) -> None:
+		self.roots = roots
+		self.want_dir = want_dir
+		self.interval = interval
+		self._snap = self._scan()
+
+	def _scan(self) -> Dict[Path, Sig]:
+		snap: Dict[Path, Sig] = {}
+		for root in self.roots:
+			for d in walk_dirs(root, self.want_dir):
+				try:
+					with os.scandir(d) as it:
+						for entry in it:
+							if entry.is_file():
+								snap[Path(entry.path)] = file_sig(Path(entry.path))
+				except OSError:
+					continue
+		return snap
+
+	def wait(self, timeout: Optional[float]) -> Optional[Set[Path]]:
+		time.sleep(self.interval if timeout is None else min(self.interval, timeout))
+		snap = self._scan()
+		changed = {p for p in snap.keys() | self._snap.keys() if snap.get(p) != self._snap.get(p)}
+		self._snap = snap
+		return changed
+
+	def close(self) -> None:
+		pass
+
+
+# ---------- watch loop ----------
+class WatchedSource:
+	"""One docs/sources.yaml entry: raw config for sync_source(), plus base/matcher for local sources."""
+
+	def __init__(self, raw_name: str, raw_cfg: Dict[str, Any], kind: str, base: Optional[Path], matcher: PathMatcher) -> None:
+		self.raw_name = raw_name
+		self.raw_cfg = raw_cfg
+		self.kind = kind
+		self.base = base
+		self.matcher = matcher
+
+
+def load_sources() -> List[WatchedSource]:
+	if not sync_repos.SOURCES_FILE.exists():
+		return []
+	spec = sync_repos.load_yaml(sync_repos.SOURCES_FILE).get("sources") or []
+	out: List[WatchedSource] = []
+	for raw_name, raw_cfg in sync_repos.iter_sources(spec):
+		try:
+			_, norm, kind = sync_repos.normalize_entry(raw_cfg or {}, name_fallback=raw_name)
+		except ValueError as e:
+			print(f"[WARN] {e}; not watched", file=sys.stderr)
+			continue
+		base = Path(norm["base"]).expanduser().resolve() if kind == "local" else None
+		out.append(WatchedSource(raw_name, raw_cfg, kind, base, PathMatcher(norm["include"], norm["exclude"])))
+	return out
+
+
+class Watch:
+	def __init__(self, mode: str, sources: List[WatchedSource], lexical: Any) -> None:
+		self.mode = mode
+		self.sources = sources
+		self.local = [s for s in sources if s.kind == "local" and s.base is not None]
+		self.git = [s for s in sources if s.kind == "git"]
+		self.lexical = lexical
+		self.http_header = sync_repos.github_auth_header()
+		self.debounce = int(os.getenv("WATCH_DEBOUNCE_MS", "500")) / 1000
+		self.max_delay = int(os.getenv("WATCH_MAX_DELAY_MS", "5000")) / 1000
+		self.git_interval = float(os.getenv("WATCH_GIT_INTERVAL", "300"))
+		self.next_git = time.monotonic() + self.git_interval
+		# The embed cache only evicts at close, which a watch process never reaches
+		self.trim_interval = float(os.getenv("WATCH_CACHE_TRIM_INTERVAL", "600"))
+		self.next_trim = time.monotonic() + self.trim_interval
+		# (size, mtime) of every docs/context/ text file as last processed
+		self.known: Dict[Path, Sig] = {p: file_sig(p) for p in embed.iter_files()}
+
+	def want_dir(self, d: Path) -> bool:
+		"""Watch all of docs/context/ and, in local sources, every directory the source's globs can reach."""
+		if d.name == ".git" or d.is_relative_to(sync_repos.ARTIFACTS):
+			return False
+		if d.is_relative_to(embed.CTX):
+			return True
+		for src in self.local:
+			if d.is_relative_to(src.base) and not src.matcher.prune(d.relative_to(src.base).as_posix()):
+				return True
+		return False
+
+	def roots(self) -> List[Path]:
+		roots = [embed.CTX]
+		for src in self.local:
+			if src.base.is_dir() and not any(src.base.is_relative_to(r) for r in roots):
+				roots = [r for r in roots if not r.is_relative_to(src.base)] + [src.base]
+		return roots
+
+	# ---------- one cycle ----------
+	def classify(self, changed: Optional[Set[Path]]) -> Tuple[Set[Path], List[WatchedSource]]:
+		"""Split changed paths into docs/context/ candidates and local sources that need a sync."""
+		if changed is None:
+			return {embed.CTX}, list(self.local)
+		ctx: Set[Path] = set()
+		dirty: List[WatchedSource] = []
+		for p in changed:
+			if p.is_relative_to(embed.CTX):
+				ctx.add(p)
+			# Staged output is never a source change (amara-core's "." would otherwise re-sync its own copies)
+			if p.is_relative_to(sync_repos.DEST_ROOT) or p.is_relative_to(sync_repos.ARTIFACTS):
+				continue
+			for src in self.local:
+				if src in dirty or not p.is_relative_to(src.base):
+					continue
+				rel = p.relative_to(src.base).as_posix()
+				# A directory (or a removed path that may have been one) counts unless the globs never reach it
+				if src.matcher.match(rel) or (not p.is_file() and not src.matcher.prune(rel)):
+					dirty.append(src)
+		return ctx, dirty
+
+	def sync(self, sources: List[WatchedSource]) -> Set[Path]:
+		"""Stage these sources; returns the docs/context/ files they wrote or removed."""
+		touched: Set[Path] = set()
+		for src in sources:
+			res = sync_repos.sync_source(src.raw_name, src.raw_cfg, dry=False, http_header=self.http_header)
+			for kind in ("copied", "deleted"):
+				touched.update(Path(rec["dst"]) for rec in res.get(kind, []))
+		return touched
+
+	def expand(self, candidates: Set[Path]) -> List[Path]:
+		"""Changed text files among the candidates (directories expand to their files, old and new)."""
+		files: Set[Path] = set()
+		for c in candidates:
+			if c in self.known:
+				files.add(c)
+			elif c.is_dir():
+				files.update(p for p in c.rglob("*") if p.is_file())
+				prefix = c.as_posix() + "/"
+				files.update(k for k in self.known if k.as_posix().startswith(prefix))
+			elif c.exists():
+				files.add(c)
+			else:
+				# Removed directory (or a file we never indexed): drop whatever we knew below it
+				prefix = c.as_posix() + "/"
+				files.update(k for k in self.known if k.as_posix().startswith(prefix))
+		return sorted(
+			p for p in files
+			if p.suffix.lower() in embed.TEXT_EXTS and file_sig(p) != self.known.get(p)
+		)
+
+	def refresh(self, candidates: Set[Path], t0: float) -> None:
+		paths = self.expand(candidates)
+		if not paths:
+			return
+		counts = embed.embed_paths(self.mode, paths)
+		lex = self.lexical.update_paths(paths) if self.lexical is not None else None
+		for p in paths:
+			sig = file_sig(p)
+			if sig is None:
+				self.known.pop(p, None)
+			else:
+				self.known[p] = sig
+		embed.METRICS.inc("cycles")
+		embed.METRICS.inc("files_changed", len(paths))
+		print(
+			f"[OK] watch: {counts['files']} changed, {counts['removed']} removed -> {counts['chunks']} chunks, "
+			f"upserted={counts['upserted']} moved={counts['moved']}{'' if lex is None else ' lexical=' + str(lex['chunks'])} "
+			f"in {time.monotonic() - t0:.2f}s"
+		)
+
+	def _debounce(self, changed: Set[Path], watcher: Any) -> Optional[Set[Path]]:
+		"""Keep collecting until WATCH_DEBOUNCE_MS pass without events (or WATCH_MAX_DELAY_MS in total)."""
+		deadline = time.monotonic() + self.max_delay
+		while True:
+			left = deadline - time.monotonic()
+			if left <= 0:
+				return changed
+			more = watcher.wait(min(self.debounce, left))
+			if more is None:
+				return None
+			if not more:
+				return changed
+			changed |= more
+
+	def _git_timeout(self) -> Optional[float]:
+		if not self.git or self.git_interval <= 0:
+			return None
+		return max(0.0, self.next_git - time.monotonic())
+
+	def run(self, watcher: Any, *, initial_sync: bool, once: bool) -> None:
+		if initial_sync:
+			t0 = time.monotonic()
+			self.refresh(self.sync(self.sources), t0)
+		if once:
+			return
+		print(f"[INFO] watching {', '.join(r.as_posix() for r in self.roots())} ({type(watcher).__name__}); git every {self.git_interval:.0f}s")
+		while True:
+			changed = watcher.wait(self._git_timeout())
+			t0 = time.monotonic()
+			if changed:
+				changed = self._debounce(changed, watcher)
+			candidates, dirty = self.classify(changed)
+			if self._git_timeout() == 0:
+				dirty += self.git
+				self.next_git = time.monotonic() + self.git_interval
+			if dirty:
+				candidates |= self.sync(dirty)
+			self.refresh(candidates, t0)
+			if time.monotonic() >= self.next_trim:
+				embed.trim_embed_cache()
+				self.next_trim = time.monotonic() + self.trim_interval
+
+
+def make_watcher(roots: List[Path], want_dir: Callable[[Path], bool]) -> Any:
+	backend = os.getenv("WATCH_BACKEND", "auto")
+	interval = float(os.getenv("WATCH_POLL_INTERVAL", "2"))
+	if backend != "poll":
+		try:
+			return InotifyWatcher(roots, want_dir)
+		except OSError as e:
+			if backend == "inotify":
+				raise
+			print(f"[WARN] inotify unavailable ({e}); polling every {interval:.0f}s", file=sys.stderr)
+	return PollWatcher(roots, want_dir, interval)
+
+
+def main(argv: List[str]) -> int:
+	parser = argparse.ArgumentParser(description="Watch sources and docs/context/; sync and re-embed only what changed.")
+	parser.add_argument("--once", action="store_true", help="Run the startup sync + embed of its changes, then exit")
+	parser.add_argument("--no-initial-sync", action="store_true", help="Do not sync every source at startup")
+	parser.add_argument("--no-lexical", action="store_true", help="Do not update artifacts/lexical.sqlite3")
+	args = parser.parse_args(argv)
+
+	mode = embed.resolve_mode()
+	if mode != "dry" and mode not in embed.EMBEDDERS:
+		print(f"[ERR] Unknown EMBED_MODE={mode}; use: openai | local | fake | dry", file=sys.stderr)
+		return 2
+	if mode == "dry" or not embed.qdrant_upsert_enabled():
+		print("[WARN] EMBED_MODE=dry or EMBED_QDRANT_UPSERT!=1: only sources and the lexical index are kept fresh")
+
+	embed.METRICS = RunMetrics("watch", mode=mode)
+	sync_repos.METRICS = RunMetrics("watch_sync")
+	lexical = None
+	if not args.no_lexical:
+		lexical = LexicalIndex()
+	# SIGTERM (docker stop, systemd) shuts down like Ctrl-C: metrics and the cache are flushed
+	signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+	watch = Watch(mode, load_sources(), lexical)
+	watcher = None
+	try:
+		if not args.once:
+			watcher = make_watcher(watch.roots(), watch.want_dir)
+		watch.run(watcher, initial_sync=not args.no_initial_sync, once=args.once)
+	except KeyboardInterrupt:
+		print("[INFO] watch stopped")
+	finally:
+		if watcher is not None:
+			watcher.close()
+		if lexical is not None:
+			lexical.close()
+		embed.report_cache_stats()
+		sync_repos.METRICS.finish(sync_repos.ARTIFACTS)
+		embed.METRICS.finish()
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv[1:]))